@@ -33,6 +33,26 @@ class Settings:
 
     AVAILABLE_SOURCES = ['Telegram', 'Google', 'Tavily']
 
+    # Максимальное число одновременных задач каждого типа при обходе регион × категория
+    SWEEP_CONCURRENCY = {
+        'Google': 1,  # Google быстро банит параллельные запросы
+        'Tavily': 4,
+        'TelegramBase': 1,  # Сбор базы каналов по категории
+        'Telegram': 4,  # Отбор сообщений региона из базы
+        'Websites': 4  # Пары, для которых одновременно парсятся сайты
+    }
+
+    # Общий пул браузеров Playwright на весь обход
+    BROWSER_POOL = {
+        'browsers': 2,  # Количество браузеров Chromium
+        'contexts_per_browser': 3,  # Контекстов (одновременных страниц) в каждом браузере
+        'pages_per_context': 50,  # После стольких страниц контекст пересоздается
+        'queue_size': 100,  # Размер очереди URL, ожидающих свободный контекст
+        'timeout': 10000,  # Таймаут навигации (мс)
+        'process_timeout': 15000,  # Общий таймаут парсинга одной страницы (мс)
+        'max_context_failures': 3  # После стольких ошибок подряд контекст пересоздается
+    }
+
     REGION_KEYWORDS = {
         "Нижегородская область": ["нижний новгород", "нижегород", "н.новгород"],
         "г. Москва": ["москва", "мск", "московский", "столица", "москвич"],
@@ -163,6 +183,17 @@ class Settings:
             'Государственная поддержка бизнеса'
         ]
     }
+    # Настройки сбора Telegram
+    TELEGRAM_MAX_CONCURRENT_CHANNELS = 4  # Одновременно скачиваемых каналов через один клиент
+    TELEGRAM_FLOOD_RETRIES = 3  # Попыток скачать канал после FloodWaitError
+    TELEGRAM_MAX_FLOOD_WAIT = 600  # Если FloodWaitError требует ждать дольше (сек.), канал пропускается
+    # Инкрементальный режим: при каждом запуске докачиваются только сообщения новее сохраненных.
+    # Если выключен, каналы, уже имеющиеся в хранилище, берутся оттуда без обращения к Telegram
+    TELEGRAM_INCREMENTAL = True
+    # Только готовые базы категорий, без подключения к Telegram (исполнители распределенного обхода:
+    # сессию Telegram нельзя открывать из нескольких процессов одновременно)
+    TELEGRAM_PREPARED_ONLY = False
+
     TELEGRAM_CHANNELS = {
         'Недвижимость':
             {
@@ -296,6 +327,60 @@ class Settings:
             }
 
     }
+    # Параллельная генерация тем через LLM
+    LLM_BATCH = {
+        'max_concurrent': 8,  # Одновременных запросов к API
+        'requests_per_minute': 60,  # Ограничение частоты запросов
+        'max_retries': 5  # Попыток при ошибках 429/5xx
+    }
+
+    # Удаление почти одинаковых текстов (MinHash-LSH) перед генерацией тем
+    NEAR_DUPLICATES = {
+        'enabled': True,
+        'threshold': 0.8,  # Минимальное сходство Жаккара по шинглам для объединения в группу
+        'num_perm': 64,  # Длина MinHash-подписи
+        'bands': 16,  # Полос LSH (num_perm должно делиться на bands)
+        'shingle_size': 3,  # Слов в шингле
+        'weight_by_group_size': False  # Умножать вес тезиса на размер группы повторов
+    }
+
+    # Транспорт OpenAI-совместимых провайдеров: общий пул соединений и потоковые ответы
+    LLM_TRANSPORT = {
+        'max_connections': 20,  # Соединений в пуле (keep-alive)
+        'keepalive_expiry': 60,  # Секунд жизни простаивающего соединения
+        'timeout': 600,  # Таймаут запроса, секунд
+        'stream': True,  # Потоковый ответ (замер времени до первого токена)
+        'stop_on_json_complete': True  # Закрывать поток, как только JSON ответа завершен
+    }
+
+    # Бюджет токенов запроса: длинные тексты делятся на части, короткие упаковываются по несколько в запрос
+    LLM_CHUNKING = {
+        'chars_per_token': 3,  # Среднее число символов на токен (русский текст)
+        'max_chunk_tokens': 3000,  # Максимальный размер части длинного текста
+        'max_pack_tokens': 6000,  # Максимальный размер пакета документов в одном запросе
+        'max_pack_documents': 20  # Максимум документов в одном запросе
+    }
+
+    # Локальная кластеризация тезисов (TF-IDF + агломеративная кластеризация), LLM только называет кластеры
+    TOPIC_CLUSTERING = {
+        'distance_threshold': 0.6,  # Косинусное расстояние, до которого тезисы объединяются в кластер
+        'dimensions': 200,  # Размерность векторов после TruncatedSVD
+        'max_block_size': 3000,  # Больше тезисов — предварительное разбиение на блоки (MiniBatchKMeans)
+        'min_named_size': 2,  # Кластеры меньшего размера называются своим тезисом без LLM
+        'max_named_clusters': 50,  # Сколько крупнейших кластеров называет LLM
+        'topics_per_naming': 15  # Сколько центральных тезисов кластера отправляется в LLM
+    }
+
+    # Кэш результатов этапов (тезисы, кластеры) по хэшу входов (очистка: python -m tools.stage_cache --clear)
+    STAGE_CACHE = {
+        'enabled': True
+    }
+
+    # Кэш ответов LLM (очистка: python -m llm.response_cache --clear)
+    LLM_RESPONSE_CACHE = {
+        'enabled': True
+    }
+
     # Настройки хранения
     OUTPUT_DIR = "outputs_data"
     # OUTPUT_ABS_DIR = os.path.abspath(OUTPUT_DIR)
@@ -304,6 +389,81 @@ class Settings:
     OUTPUT_DIR_RAW = os.path.join(OUTPUT_ABS_DIR, OUTPUT_DIR, "raw")
     OUTPUT_DIR_TOPICS = os.path.join(OUTPUT_ABS_DIR, OUTPUT_DIR, "topics")
     OUTPUT_DIR_CLUSTERS = os.path.join(OUTPUT_ABS_DIR, OUTPUT_DIR, "clusters")
+    OUTPUT_DIR_CACHE = os.path.join(OUTPUT_ABS_DIR, OUTPUT_DIR, "cache")
+    # Формат промежуточных данных между шагами ('parquet' или 'feather'). Excel — только финальная выгрузка
+    INTERMEDIATE_FORMAT = 'parquet'
+
+    # Перехват запросов в браузере: для текста страницы не нужны картинки, шрифты, стили и счетчики
+    BROWSER_INTERCEPTION = {
+        'enabled': True,
+        'blocked_resource_types': ['image', 'media', 'font', 'stylesheet'],
+        'blocked_domains': [
+            'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'doubleclick.net',
+            'mc.yandex.ru', 'an.yandex.ru', 'yandexadexchange.net', 'adfox.ru', 'top-fwz1.mail.ru',
+            'counter.yadro.ru', 'tns-counter.ru', 'mediametrics.ru', 'facebook.net', 'criteo.com'
+        ],
+        'scroll_by_default': False,  # Прокручивать страницу перед чтением текста
+        'scroll_domains': [],  # Домены, которые догружают текст при прокрутке
+        # Средний размер ресурса, КБ — для оценки сэкономленного трафика
+        'average_resource_kb': {'image': 60, 'media': 500, 'font': 40, 'stylesheet': 30, 'tracker': 20}
+    }
+
+    # Извлечение текста из HTML (сравнение экстракторов: python -m tools.html_extract)
+    HTML_EXTRACTION = {
+        # 'soup' — прежний BeautifulSoup, 'lxml' — быстрый разбор с поиском основного содержимого
+        # (переключать после сравнения на сохраненном корпусе)
+        'backend': 'soup',
+        'main_content': True,  # Отбрасывать шаблон сайта (меню, списки ссылок), оставляя основной текст
+        'min_main_share': 0.25,  # Если основное содержимое короче этой доли текста страницы, берется вся страница
+        'max_length': 50000,  # Максимальная длина текста страницы
+        'save_corpus': 0  # Сколько страниц сохранить в корпус для сравнения экстракторов
+    }
+
+    # Загрузка страниц сначала по HTTP, браузер только для доменов, которым он нужен
+    HTTP_FETCH = {
+        'enabled': True,
+        'max_connections': 50,  # Соединений в пуле HTTP-клиента
+        'timeout': 15,  # Таймаут HTTP-запроса, секунд
+        'min_text_length': 500,  # Более короткий текст считается неудачей (страница рисуется скриптами)
+        'browser_after_failures': 3,  # После стольких неудач HTTP подряд домен загружается только в браузере
+        'reprobe_every': 50,  # Домен на браузере снова пробуется по HTTP через столько страниц
+        'reprobe_interval': 24 * 60 * 60  # ... или через столько секунд с прошлой пробы
+    }
+
+    # Вежливая загрузка сайтов: лимиты на каждый хост с подстройкой по AIMD
+    HOST_SCHEDULER = {
+        'max_total': 32,  # Одновременных загрузок на весь обход
+        'initial_per_host': 2,  # Начальный лимит одновременных запросов к одному хосту
+        'max_per_host': 8,  # Максимальный лимит на хост
+        'min_interval': 0.25,  # Минимальный интервал между стартами запросов к одному хосту, секунд
+        'slow_latency': 10  # Ответ дольше (секунд) считается перегрузкой и уменьшает лимит вдвое
+    }
+
+    # Обход несколькими процессами (и машинами) из общей очереди пар (запуск: tools.sharded_sweep.run_sharded)
+    SHARDED_SWEEP = {
+        'workers': 1,  # Процессов-исполнителей на этой машине (1 и nodes = 1 — весь обход в текущем процессе)
+        'nodes': 1,  # Машин, подключающихся к очереди (остальные запускают python -m tools.sharded_sweep)
+        'shared_dir': None,  # Общее хранилище для очереди и результатов (None — локальный каталог кэша)
+        'journal_mode': 'WAL',  # Режим журнала SQLite очереди ('DELETE' для сетевой папки)
+        'batch_size': 4,  # Пар одной категории, которые исполнитель берет за раз
+        'lease_seconds': 900,  # Аренда пачки: не продленная за это время возвращается в очередь
+        'max_batch_seconds': 4 * 60 * 60,  # Дольше аренда пачки не продлевается, даже если работа идет
+        'max_attempts': 2,  # Попыток на пару, после которых она считается упавшей
+        'progress_interval': 60  # Как часто выводить прогресс очереди, секунд
+    }
+
+    # Журнал обхода (регион, категория, этап) для продолжения после падения
+    RUN_MANIFEST = {
+        'enabled': True,
+        'resume': True  # Пропускать готовые пары, упавшие и незавершенные выполнять заново
+    }
+
+    # Кэш очищенного текста страниц сайтов
+    PAGE_CACHE = {
+        'enabled': True,
+        'ttl_days': 30,  # Время жизни записи
+        'max_size_mb': 1024  # Максимальный размер кэша на диске
+    }
 
 
 
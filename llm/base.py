@@ -0,0 +1,267 @@
+import asyncio
+import json
+import re
+import time
+from typing import Callable
+
+from llm.batching import run_batch, acquire_rate_limit
+from llm.chunking import (agenerate_topics_packed, agenerate_topics_packed_with_status, estimate_tokens,
+                          packed_system_message, parse_packed_response)
+from llm.metrics import CallMetrics, get_llm_metrics
+from llm.prompts import (TOPICS_SYSTEM_MESSAGE, TOPICS_USER_MESSAGE,
+                         CLUSTERIZATION_SYSTEM_MESSAGE, CLUSTERIZATION_USER_MESSAGE,
+                         CLUSTER_NAMING_SYSTEM_MESSAGE, CLUSTER_NAMING_USER_MESSAGE)
+from llm.response_cache import get_response_cache
+from llm.transport import Transport
+from tools.stage_cache import content_hash, get_stage_cache
+
+
+class BaseHotNewsGenerator:
+    """
+    Общий клиент LLM: промпты, кэш ответов, ограничение частоты, пакетная обработка и метрики вызовов.
+
+    Провайдеры — тонкие адаптеры, которые задают имя провайдера и транспорт.
+    """
+
+    provider: str = None
+
+    def __init__(self, model: str, model_version: str, transport: Transport):
+        """
+        :param model: Название модели для логов
+        :param model_version: Идентификатор модели у провайдера
+        :param transport: Транспорт запросов к провайдеру
+        """
+        self.model = model
+        self.model_version = model_version
+        self.transport = transport
+
+    def generate_topics(self, region: str, category: str, message: str, user_message: str = None,
+                        system_message: str = None) -> dict:
+        """
+        Генерация тезисов
+
+        :param user_message: Промт пользователя
+        :param system_message: Системное сообщение (роль модели)
+        :return: Ответ модели
+        """
+        if not system_message:
+            system_message = TOPICS_SYSTEM_MESSAGE.format(region=region, category=category)
+
+        if not user_message:
+            user_message = TOPICS_USER_MESSAGE + message
+
+        try:
+            print(f'Генерируются тезисы: {message[:100]}...')
+            content = self._complete(system_message, user_message, self._is_json_response)
+            correct_response = self.parse_json_obj_from_llm(content)
+            return correct_response
+        except Exception as e:
+            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
+
+    def clusterization_topics(self, message: str, user_message: str = None, system_message: str = None) -> dict:
+        """
+        Кластеризация тезисов
+
+        :param user_message: Промт пользователя
+        :param system_message: Системное сообщение (роль модели)
+        :return: Ответ модели
+        """
+        if not system_message:
+            system_message = CLUSTERIZATION_SYSTEM_MESSAGE
+
+        if not user_message:
+            user_message = CLUSTERIZATION_USER_MESSAGE + message
+
+        try:
+            print(f'Кластеризируются тезисы: {message[:100]}...')
+            content = self._complete(system_message, user_message, self._is_json_response)
+            correct_response = self.parse_json_obj_from_llm(content)
+            return correct_response
+        except Exception as e:
+            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
+
+    def name_cluster(self, topics: list[str]) -> dict:
+        """
+        Название и суммаризация кластера тезисов, собранного локально
+
+        :param topics: Тезисы кластера (ближайшие к центру)
+        :return: {"cluster_name": ..., "summarize": [{"theme": ...}]}
+        """
+        user_message = CLUSTER_NAMING_USER_MESSAGE + '\n'.join(f'- {topic}' for topic in topics)
+        try:
+            content = self._complete(CLUSTER_NAMING_SYSTEM_MESSAGE, user_message, self._is_json_response)
+            return self.parse_json_obj_from_llm(content)
+        except Exception as e:
+            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
+
+    async def aname_clusters(self, clusters: list[list[str]], max_concurrent: int = None,
+                             requests_per_minute: float = None) -> list:
+        """Параллельное название кластеров (None для неудачных запросов)"""
+        return await run_batch(self.name_cluster, clusters, max_concurrent, requests_per_minute,
+                               desc='Названия кластеров')
+
+    def name_clusters(self, clusters: list[list[str]], max_concurrent: int = None,
+                      requests_per_minute: float = None) -> list:
+        """Синхронная обертка для aname_clusters"""
+        return asyncio.run(self.aname_clusters(clusters, max_concurrent, requests_per_minute))
+
+    def _complete(self, system_message: str, user_message: str, validate: Callable[[str], bool] = None) -> str:
+        """
+        Запрос к модели с кэшированием ответа и записью метрик вызова.
+
+        В кэш попадает только непустой ответ, который принимает validate (например, из него разбирается JSON):
+        оборванные и неразборчивые ответы запрашиваются заново при следующем запуске
+        """
+        cache = get_response_cache()
+        if cache:
+            content = cache.get(self.provider, self.model_version, system_message, user_message)
+            if content is not None:
+                return content
+
+        acquire_rate_limit()
+        started_at = time.perf_counter()
+        try:
+            completion = self.transport.complete(self.model_version, system_message, user_message)
+        except Exception:
+            get_llm_metrics().record(CallMetrics(self.provider, self.model_version,
+                                                 time.perf_counter() - started_at, error=True))
+            raise
+
+        # Если провайдер не вернул расход токенов (например, поток закрыт раньше), оцениваем его
+        get_llm_metrics().record(CallMetrics(
+            provider=self.provider,
+            model_version=self.model_version,
+            latency=time.perf_counter() - started_at,
+            prompt_tokens=completion.prompt_tokens or estimate_tokens(system_message + user_message),
+            completion_tokens=completion.completion_tokens or estimate_tokens(completion.content),
+            time_to_first_token=completion.time_to_first_token,
+            stopped_early=completion.stopped_early
+        ))
+
+        content = completion.content
+        if cache and content and content.strip() and (validate is None or validate(content)):
+            cache.set(self.provider, self.model_version, system_message, user_message, content)
+        return content
+
+    def _is_json_response(self, content: str) -> bool:
+        """Из ответа разбирается непустой JSON"""
+        return bool(self.parse_json_obj_from_llm(content))
+
+    def _is_packed_response(self, content: str) -> bool:
+        """Ответ на упакованный запрос разбирается в тезисы по документам"""
+        return parse_packed_response(self.parse_json_obj_from_llm(content)) is not None
+
+    def _complete_packed(self, system_message: str, user_message: str) -> str:
+        return self._complete(system_message, user_message, self._is_packed_response)
+
+    async def agenerate_topics_batch(self, region: str, category: str, messages: list[str],
+                                     max_concurrent: int = None, requests_per_minute: float = None) -> list:
+        """
+        Параллельная генерация тезисов для списка текстов
+
+        :param messages: Тексты для анализа
+        :param max_concurrent: Максимальное количество одновременных запросов
+        :param requests_per_minute: Ограничение частоты запросов
+        :return: Ответы модели в порядке messages (None для пустых текстов и неудачных запросов)
+        """
+        return await run_batch(
+            lambda message: self.generate_topics(region, category, message),
+            messages, max_concurrent, requests_per_minute
+        )
+
+    def generate_topics_batch(self, region: str, category: str, messages: list[str],
+                              max_concurrent: int = None, requests_per_minute: float = None) -> list:
+        """Синхронная обертка для agenerate_topics_batch"""
+        return asyncio.run(self.agenerate_topics_batch(region, category, messages, max_concurrent, requests_per_minute))
+
+    async def agenerate_topics_packed(self, region: str, category: str, messages: list[str],
+                                      max_concurrent: int = None, requests_per_minute: float = None) -> list:
+        """
+        Генерация тезисов с бюджетом токенов: длинные тексты делятся на части,
+        короткие упаковываются по несколько в один запрос (настройки в settings.LLM_CHUNKING)
+
+        :return: Ответы в формате generate_topics в порядке messages (None для пустых текстов и неудачных запросов)
+        """
+        return await agenerate_topics_packed(self._complete_packed, self.parse_json_obj_from_llm, region, category,
+                                             messages, max_concurrent, requests_per_minute)
+
+    def generate_topics_packed(self, region: str, category: str, messages: list[str],
+                               max_concurrent: int = None, requests_per_minute: float = None) -> list:
+        """Синхронная обертка для agenerate_topics_packed"""
+        return asyncio.run(self.agenerate_topics_packed(region, category, messages, max_concurrent, requests_per_minute))
+
+    async def agenerate_topics_incremental(self, region: str, category: str, messages: list[str],
+                                           max_concurrent: int = None, requests_per_minute: float = None) -> list:
+        """
+        Генерация тезисов только для новых и измененных текстов.
+
+        Тезисы каждого текста сохраняются в кэше этапов по хэшу (текст, промпт, провайдер, модель),
+        остальные тексты генерируются упакованными запросами (agenerate_topics_packed)
+
+        :return: Ответы в формате generate_topics в порядке messages (None для пустых текстов и неудачных запросов)
+        """
+        cache = get_stage_cache()
+        if cache is None:
+            return await self.agenerate_topics_packed(region, category, messages, max_concurrent, requests_per_minute)
+
+        system_message = packed_system_message(region, category)
+        keys = [content_hash(self.provider, self.model_version, system_message, message)
+                if isinstance(message, str) and message.strip() else None for message in messages]
+        cached = cache.get_many('topics', [key for key in keys if key])
+
+        missing = [index for index, key in enumerate(keys) if key and key not in cached]
+        print(f'Тезисы: из кэша {len(cached)}, генерируется {len(missing)}')
+        generated, complete = await agenerate_topics_packed_with_status(
+            self._complete_packed, self.parse_json_obj_from_llm, region, category, [messages[index] for index in missing],
+            max_concurrent, requests_per_minute
+        ) if missing else ([], [])
+        # В кэш попадают только тексты, для всех частей которых модель вернула ответ
+        cache.set_many('topics', {keys[index]: result
+                                  for index, result, is_complete in zip(missing, generated, complete) if is_complete})
+
+        results = [cached.get(key) if key else None for key in keys]
+        for index, result in zip(missing, generated):
+            results[index] = result
+        return results
+
+    def generate_topics_incremental(self, region: str, category: str, messages: list[str],
+                                    max_concurrent: int = None, requests_per_minute: float = None) -> list:
+        """Синхронная обертка для agenerate_topics_incremental"""
+        return asyncio.run(self.agenerate_topics_incremental(region, category, messages, max_concurrent,
+                                                             requests_per_minute))
+
+    @staticmethod
+    def parse_json_obj_from_llm(text: str) -> dict:
+        """
+        Пытается извлечь JSON из ответа LLM.
+        Если не получается — возвращает пустой словарь {}.
+        """
+        if not text:
+            return {}
+
+        try:
+            # 1. Пробуем распарсить как чистый JSON
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+
+        # 2. Чистим markdown-форматирование (```json и ```)
+        cleaned_text = re.sub(r'^```(json)?\n|```$', '', text.strip(), flags=re.MULTILINE)
+        cleaned_text = cleaned_text.strip()
+
+        # 3. Пробуем распарсить очищенный текст
+        try:
+            return json.loads(cleaned_text)
+        except json.JSONDecodeError:
+            pass
+
+        # 4. Пытаемся найти JSON в подстроке
+        try:
+            json_match = re.search(r'\{[\s\S]*?\}', cleaned_text)
+            if json_match:
+                return json.loads(json_match.group(0))
+        except (json.JSONDecodeError, AttributeError):
+            pass
+
+        # 5. Если всё провалилось — возвращаем {} вместо ошибки
+        return {}
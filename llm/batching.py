@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential, retry_if_exception
+from tqdm import tqdm
+
+from config.settings import settings
+from llm.metrics import get_llm_metrics
+from llm.response_cache import get_response_cache
+
+# Коды ответа, после которых запрос имеет смысл повторить
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов: не больше requests_per_minute запросов в минуту с допустимым всплеском burst.
+
+    Вызывается из рабочих потоков непосредственно перед обращением к API, поэтому ответы из кэша
+    лимит не расходуют.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.rate = requests_per_minute / 60
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.rate)
+
+
+# Ограничитель текущего пакета. asyncio.to_thread копирует контекст в рабочий поток,
+# поэтому клиент видит ограничитель пакета, из которого он вызван
+_rate_limiter: ContextVar[Optional[TokenBucket]] = ContextVar('rate_limiter', default=None)
+
+
+def acquire_rate_limit():
+    """Ждет разрешения ограничителя частоты текущего пакета (вне пакета — ничего не делает)"""
+    rate_limiter = _rate_limiter.get()
+    if rate_limiter:
+        rate_limiter.acquire()
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for attr in ('status_code', 'http_status', 'status'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Ошибка лимита запросов (429) или сервера (5xx).
+
+    Клиенты оборачивают исключения SDK в Exception, поэтому проверяем всю цепочку исключений.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status_code = _status_code(error)
+        if status_code in RETRYABLE_STATUS_CODES:
+            return True
+        text = str(error).lower()
+        if '429' in text or 'rate limit' in text or 'too many requests' in text:
+            return True
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+async def run_batch(func: Callable[[object], object],
+                    items: list,
+                    max_concurrent: int = None,
+                    requests_per_minute: float = None,
+                    max_retries: int = None,
+                    desc: str = 'Генерация тем') -> list:
+    """
+    Параллельно вызывает синхронную функцию func для каждого элемента items.
+
+    Одновременных запросов не больше max_concurrent, частота ограничена requests_per_minute,
+    ошибки 429/5xx повторяются с экспоненциальной задержкой. Результаты возвращаются в порядке items,
+    пустые элементы и элементы, для которых запрос так и не удался, дают None.
+    """
+    max_concurrent = max_concurrent or settings.LLM_BATCH['max_concurrent']
+    requests_per_minute = requests_per_minute or settings.LLM_BATCH['requests_per_minute']
+    max_retries = max_retries or settings.LLM_BATCH['max_retries']
+
+    semaphore = asyncio.Semaphore(max_concurrent)
+    _rate_limiter.set(TokenBucket(requests_per_minute, burst=max_concurrent))
+    results = [None] * len(items)
+    progress = tqdm(total=len(items), desc=desc)
+
+    async def process(index: int, item):
+        try:
+            if not isinstance(item, (str, list)) or not item:
+                return
+
+            async with semaphore:
+                async for attempt in AsyncRetrying(
+                        stop=stop_after_attempt(max_retries),
+                        wait=wait_exponential(multiplier=1, min=2, max=60),
+                        retry=retry_if_exception(is_retryable_error),
+                        reraise=True):
+                    with attempt:
+                        results[index] = await asyncio.to_thread(func, item)
+        except Exception as e:
+            print(f'Ошибка при обработке элемента {index}: {e}')
+        finally:
+            progress.update(1)
+
+    await asyncio.gather(*(process(index, item) for index, item in enumerate(items)))
+    progress.close()
+
+    response_cache = get_response_cache()
+    if response_cache:
+        response_cache.print_statistics()
+    get_llm_metrics().print_statistics()
+    return results
@@ -0,0 +1,184 @@
+import math
+import re
+from typing import Callable, Optional
+
+from config.settings import settings
+from llm.batching import run_batch
+from llm.prompts import PACKED_TOPICS_SYSTEM_MESSAGE, PACKED_TOPICS_USER_MESSAGE
+
+# Границы предложений и абзацев, по которым режутся длинные тексты
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Приблизительное количество токенов текста.
+
+    Токенизаторы у провайдеров разные, поэтому считаем по среднему числу символов на токен
+    (settings.LLM_CHUNKING['chars_per_token']) — для бюджета запроса этого достаточно.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / settings.LLM_CHUNKING['chars_per_token'])
+
+
+def split_document(text: str, max_tokens: int) -> list[str]:
+    """
+    Делит текст на части не длиннее max_tokens.
+
+    Режет по границам предложений и абзацев, предложение длиннее бюджета режется по символам.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    max_chars = max_tokens * settings.LLM_CHUNKING['chars_per_token']
+    chunks, current = [], ''
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f'{current} {sentence}' if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_documents(documents: list[tuple[int, str]], max_tokens: int, max_documents: int) -> list[list[tuple[int, str]]]:
+    """
+    Упаковывает документы (id, текст) в пакеты: сумма токенов пакета не больше max_tokens,
+    документов в пакете не больше max_documents. Порядок документов сохраняется.
+    """
+    packs, current, current_tokens = [], [], 0
+    for doc_id, text in documents:
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_documents):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append((doc_id, text))
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def packed_system_message(region: str, category: str) -> str:
+    return PACKED_TOPICS_SYSTEM_MESSAGE.format(region=region, category=category)
+
+
+def packed_user_message(pack: list[tuple[int, str]]) -> str:
+    return PACKED_TOPICS_USER_MESSAGE + '\n\n'.join(f'[ID: {doc_id}]\n{text}' for doc_id, text in pack)
+
+
+def parse_packed_response(response) -> Optional[dict[int, list[str]]]:
+    """Тезисы ответа модели по идентификаторам документов (None, если ответ не в ожидаемом формате)"""
+    if isinstance(response, dict):
+        response = response.get('documents')
+    if not isinstance(response, list):
+        return None
+
+    topics = {}
+    for item in response:
+        if not isinstance(item, dict):
+            continue
+        try:
+            doc_id = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        topics[doc_id] = [topic for topic in item.get('topics') or [] if isinstance(topic, str) and topic]
+    return topics
+
+
+async def agenerate_topics_packed(complete: Callable[[str, str], str],
+                                  parse_json: Callable[[str], object],
+                                  region: str,
+                                  category: str,
+                                  messages: list[str],
+                                  max_concurrent: int = None,
+                                  requests_per_minute: float = None) -> list[Optional[dict]]:
+    """
+    Генерация тезисов с бюджетом токенов.
+
+    Длинные тексты делятся на части, короткие упаковываются по несколько в один запрос,
+    поэтому системный промпт оплачивается один раз на пакет. Тезисы частей одного текста объединяются.
+
+    :param complete: Запрос к модели (system_message, user_message) -> сырой ответ
+    :param parse_json: Разбор JSON из ответа модели
+    :return: {"topics": [...]} в порядке messages (None для пустых текстов и неудачных запросов)
+    """
+    results, _ = await agenerate_topics_packed_with_status(complete, parse_json, region, category, messages,
+                                                           max_concurrent, requests_per_minute)
+    return results
+
+
+async def agenerate_topics_packed_with_status(complete: Callable[[str, str], str],
+                                              parse_json: Callable[[str], object],
+                                              region: str,
+                                              category: str,
+                                              messages: list[str],
+                                              max_concurrent: int = None,
+                                              requests_per_minute: float = None
+                                              ) -> tuple[list[Optional[dict]], list[bool]]:
+    """
+    То же, что agenerate_topics_packed, и признак полноты по каждому тексту: True, если модель
+    вернула ответ для всех частей текста (неполные результаты нельзя сохранять в кэш)
+    """
+    max_chunk_tokens = settings.LLM_CHUNKING['max_chunk_tokens']
+    system_message = packed_system_message(region, category)
+
+    # Части документов: id части -> индекс исходного текста
+    chunks, owners = [], []
+    for index, message in enumerate(messages):
+        if not isinstance(message, str) or not message.strip():
+            continue
+        for chunk in split_document(message, max_chunk_tokens):
+            chunks.append((len(chunks), chunk))
+            owners.append(index)
+
+    packs = pack_documents(chunks, settings.LLM_CHUNKING['max_pack_tokens'],
+                           settings.LLM_CHUNKING['max_pack_documents'])
+
+    def process(pack: list[tuple[int, str]]) -> Optional[dict[int, list[str]]]:
+        return parse_packed_response(parse_json(complete(system_message, packed_user_message(pack))))
+
+    responses = await run_batch(process, packs, max_concurrent, requests_per_minute)
+
+    results: list[Optional[dict]] = [None] * len(messages)
+    missing_chunks = [0] * len(messages)
+    for index in owners:
+        missing_chunks[index] += 1
+    for pack, response in zip(packs, responses):
+        if response is None:
+            continue
+        for chunk_id, _ in pack:
+            # Модель могла пропустить документ в ответе: такая часть считается без ответа
+            if chunk_id not in response:
+                continue
+            index = owners[chunk_id]
+            missing_chunks[index] -= 1
+            if results[index] is None:
+                results[index] = {'topics': []}
+            for topic in response.get(chunk_id, []):
+                if topic not in results[index]['topics']:
+                    results[index]['topics'].append(topic)
+
+    _print_statistics(messages, chunks, packs, system_message)
+    complete_results = [results[index] is not None and not missing_chunks[index] for index in range(len(messages))]
+    return results, complete_results
+
+
+def _print_statistics(messages: list[str], chunks: list, packs: list, system_message: str):
+    system_tokens = estimate_tokens(system_message)
+    texts = [message for message in messages if isinstance(message, str) and message.strip()]
+    unpacked_tokens = sum(system_tokens + estimate_tokens(text) for text in texts)
+    packed_tokens = sum(system_tokens + sum(estimate_tokens(text) for _, text in pack) for pack in packs)
+    print(f'Упаковка запросов: текстов {len(texts)}, частей {len(chunks)}, запросов {len(packs)} '
+          f'(без упаковки {len(texts)}), входных токенов ~{packed_tokens} (без упаковки ~{unpacked_tokens})')
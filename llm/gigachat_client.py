@@ -1,22 +1,15 @@
-import json
-import re
-
 from langchain_community.chat_models.gigachat import GigaChat
 from langchain.schema import SystemMessage, HumanMessage
-import os
 
 from config.settings import settings
+from llm.base import BaseHotNewsGenerator
+from llm.transport import Transport, Completion
 
 
-class GigaChatHotNewsGenerator:
-    def __init__(self, credentials, model):
-        """
-        Инициализация с использованием LangChain
+class GigaChatTransport(Transport):
+    """Транспорт GigaChat через LangChain (модель задается при создании)"""
 
-        :param credentials: Авторизационные данные (логин/пароль или токен)
-        """
-        self.model = model
-        self.credentials = credentials
+    def __init__(self, credentials: str, model: str):
         self.llm = GigaChat(
             credentials=credentials,
             scope="GIGACHAT_API_PERS",
@@ -27,178 +20,30 @@ class GigaChatHotNewsGenerator:
             early_stopping_method="generate"
         )
 
-    def generate_topics(self, message: str, user_message: str = None, system_message: str = None) -> dict:
-        """
-        Генерация тезисов
-
-        :param user_message: Промт пользователя
-        :param system_message: Системное сообщение (роль модели)
-        :return: Ответ модели
-        """
-        if not system_message:
-            system_message = """
-            Ты профессиональный аналитик, который умеет вычленять из текста самые важные темы, которые состоят из тезисов, инсайдов и другой крайне интересной информации.
-    
-            Требования:  
-            1. Если тезис касается конкретного объекта, в нем ДОЛЖНО быть указано НАЗВАНИЕ ОБЪЕКТА.   
-            2. Тезисы должны быть самодостаточными: по каждому можно понять суть без дополнительной информации.  
-            3. Максимум 3 тезиса, минимум — 0.  
-            4. Тезисы должны быть уникальными по смыслу (без дублирования).  
-            5. Только интересная/значимая информация (не тривиальные факты).  
-            6. ВЫВОДИ пустой json, если вообще нет подходящих тем или во всем тексте прослеживается какая-то реклама продукта.
-            7. В полученных темах ОБЯЗАТЕЛЬНО должно говориться про регион "Нижегородская область" и тема "Недвижимость" (другие регионы и темы не интересуют).
-    
-            Формат ответа (JSON):
-                            ```json
-                            {
-                                "topics": [  
-                                    "<Тезис1>",
-                                    "<Тезис2>",
-                                    "<Тезис3>"
-                                ]
-                            }
-                             ```
-            """
-
-            # print(system_message)
-
-        if not user_message:
-            user_message = "Проанализируй текст и выдели тезисы.\n Текст: " + message
-
-        messages = [
+    def complete(self, model_version: str, system_message: str, user_message: str) -> Completion:
+        response = self.llm.invoke([
             SystemMessage(content=system_message),
             HumanMessage(content=user_message)
-        ]
+        ])
+        usage = getattr(response, 'usage_metadata', None) or {}
+        return Completion(
+            content=response.content,
+            prompt_tokens=usage.get('input_tokens'),
+            completion_tokens=usage.get('output_tokens')
+        )
 
-        try:
-            response = self.llm(messages)
-            correct_response = self.parse_json_obj_from_llm(response.content)
-            return correct_response
-        except Exception as e:
-            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
 
-    def clusterization_topics(self, message: str, user_message: str = None, system_message: str = None) -> dict:
-        """
-        Генерация тезисов
+class GigaChatHotNewsGenerator(BaseHotNewsGenerator):
+    provider = 'gigachat'
 
-        :param user_message: Промт пользователя
-        :param system_message: Системное сообщение (роль модели)
-        :return: Ответ модели
+    def __init__(self, credentials, model):
         """
-        if not system_message:
-            system_message = """
-            Ты — профессиональный аналитик, специализирующийся на кластеризации тем и их анализе. Тебе на вход подаётся список словарей в формате `list[dict]`, где каждый словарь содержит новостную тему (`topic`) и её вес (`weight`).
-            
-            Требования:  
-            1. Кластеризация по смыслу (поле "topics"): Группируй темы, близкие по смыслу, в один кластер.  
-            2. Выделение уникальных объектов: Если в теме упоминается конкретный объект, продукт или уникальная сущность (например, "iPhone 15", "Tesla Cybertruck"), выдели его в отдельный кластер.  
-            3. Название кластера (поле "cluster_name"):  
-               - Должно быть кратким (не более 5 слов).  
-            4. Суммаризация тем в кластере (поле "summarize"):
-               - На основе "topics" необхожимо сформировать основные мысли "theme"
-               - Каждая тема в рамках кластера должна быть уникальной
-               - Не должно быть такого, что про какую-то "topics" не рассказывается в "theme"
-               - "theme" должны быть самодостаточными и с законченной мыслью
-               - В одной "theme" не более 3 предложений
-            
-            Формат вывода:  
-            Строго выводи ответ в формате JSON (без Markdown-обрамления), где каждый кластер имеет структуру:  
-            ```json
-            {
-                "cluster_name": "Название кластера",
-                "summarize": [
-                    {
-                        "theme": "Полный текст суммаризированной темы 1"
-                    }, ...
-                    {
-                        "theme": "Полный текст суммаризированной темы N"
-                    }
-                ]
-                "topics": [
-                    {
-                        "topic": "Полный текст темы 1",
-                        "weight": вес1
-                    }, ... 
-                    {
-                        "topic": "Полный текст темы N",
-                        "weight": весN
-                    } 
-                ]
-            }
-            ```
-"""
-
-            # print(system_message)
-
-        if not user_message:
-            user_message = "Список тем: " + message
-
-        messages = [
-            SystemMessage(content=system_message),
-            HumanMessage(content=user_message)
-        ]
-        print(system_message)
-        print(user_message)
-
-        try:
-            response = self.llm(messages)
-            correct_response = self.parse_json_obj_from_llm(response.content)
-            return correct_response
-        except Exception as e:
-            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
-
-    # Парсер для JSON-ответов от LLM
-    # def parse_json_obj_from_llm(self, text: str) -> dict:
-    #     try:
-    #         json_string = text.strip('"')
-    #         cleaned_json = re.sub(r'```json\n|```', '', json_string)
-    #         cleaned_json = cleaned_json.strip()
-    #         json_insights_data = json.loads(cleaned_json)
-    #
-    #         return json_insights_data
-    #     except json.JSONDecodeError:
-    #         # Если JSON некорректен, пытаемся извлечь JSON0
-    #         json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    #         if json_match:
-    #             return json.loads(json_match.group(0))
-    #         raise ValueError("LLM response is not valid JSON")
-
-
+        Инициализация с использованием LangChain
 
-    def parse_json_obj_from_llm(self, text: str) -> dict:
-        """
-        Пытается извлечь JSON из ответа LLM.
-        Если не получается — возвращает пустой словарь {}.
+        :param credentials: Авторизационные данные (логин/пароль или токен)
         """
-        if not text:
-            return {}
-
-        try:
-            # 1. Пробуем распарсить как чистый JSON
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-
-        # 2. Чистим markdown-форматирование (```json и ```)
-        cleaned_text = re.sub(r'^```(json)?\n|```$', '', text.strip(), flags=re.MULTILINE)
-        cleaned_text = cleaned_text.strip()
-
-        # 3. Пробуем распарсить очищенный текст
-        try:
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError:
-            pass
-
-        # 4. Пытаемся найти JSON в подстроке
-        try:
-            json_match = re.search(r'\{[\s\S]*?\}', cleaned_text)
-            if json_match:
-                return json.loads(json_match.group(0))
-        except (json.JSONDecodeError, AttributeError):
-            pass
-
-        # 5. Если всё провалилось — возвращаем {} вместо ошибки
-        return {}
+        self.credentials = credentials
+        super().__init__(model, model, GigaChatTransport(credentials, model))
 
 
 # Пример использования
@@ -0,0 +1,80 @@
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CallMetrics:
+    """Один вызов API модели"""
+    provider: str
+    model_version: str
+    latency: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    time_to_first_token: Optional[float] = None
+    stopped_early: bool = False
+    error: bool = False
+
+
+class LLMMetrics:
+    """
+    Задержка и токены по каждому вызову API (ответы из кэша не учитываются).
+
+    Сводка по провайдеру и модели позволяет сравнивать провайдеров по пропускной способности.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: list[CallMetrics] = []
+
+    def record(self, call: CallMetrics):
+        with self._lock:
+            self.calls.append(call)
+
+    def summary(self) -> list[dict]:
+        with self._lock:
+            calls = list(self.calls)
+
+        groups = defaultdict(list)
+        for call in calls:
+            groups[(call.provider, call.model_version)].append(call)
+
+        result = []
+        for (provider, model_version), group in groups.items():
+            succeeded = [call for call in group if not call.error]
+            latencies = sorted(call.latency for call in succeeded)
+            first_tokens = [call.time_to_first_token for call in succeeded if call.time_to_first_token is not None]
+            busy_time = sum(latencies)
+            completion_tokens = sum(call.completion_tokens for call in succeeded)
+            result.append({
+                'provider': provider,
+                'model_version': model_version,
+                'calls': len(group),
+                'errors': len(group) - len(succeeded),
+                'latency_mean': busy_time / len(latencies) if latencies else 0,
+                'latency_p95': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0,
+                'time_to_first_token_mean': sum(first_tokens) / len(first_tokens) if first_tokens else None,
+                'prompt_tokens': sum(call.prompt_tokens for call in succeeded),
+                'completion_tokens': completion_tokens,
+                'completion_tokens_per_second': completion_tokens / busy_time if busy_time else 0,
+                'stopped_early': sum(call.stopped_early for call in succeeded)
+            })
+        return result
+
+    def print_statistics(self):
+        for row in self.summary():
+            first_token = row['time_to_first_token_mean']
+            first_token = f'{first_token:.2f} с' if first_token is not None else '—'
+            print(f"LLM {row['provider']} / {row['model_version']}: вызовов {row['calls']} "
+                  f"(ошибок {row['errors']}), задержка {row['latency_mean']:.2f} с (p95 {row['latency_p95']:.2f} с), "
+                  f"первый токен {first_token}, токенов {row['prompt_tokens']} → {row['completion_tokens']} "
+                  f"({row['completion_tokens_per_second']:.1f} ток/с), остановлено по JSON: {row['stopped_early']}")
+
+
+_llm_metrics = LLMMetrics()
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """Общие метрики вызовов LLM процесса"""
+    return _llm_metrics
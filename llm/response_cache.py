@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config.settings import settings
+
+
+class LLMResponseCache:
+    """
+    Дисковый кэш ответов LLM (SQLite).
+
+    Ключ — хэш от (провайдер, версия модели, системный промпт, сообщение пользователя), поэтому
+    повторный запуск или тот же пост, попавший в несколько регионов, не вызывает API повторно.
+    Хранится сырой текст ответа, чтобы изменения в разборе JSON применялись и к закэшированным ответам.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(provider: str, model_version: str, system_message: str, user_message: str) -> str:
+        payload = json.dumps([provider, model_version, system_message, user_message], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, provider: str, model_version: str, system_message: str, user_message: str) -> Optional[str]:
+        """Сырой текст ответа модели из кэша или None"""
+        key = self.make_key(provider, model_version, system_message, user_message)
+        with self._lock:
+            row = self.connection.execute('SELECT content FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set(self, provider: str, model_version: str, system_message: str, user_message: str,
+            content: Optional[str]):
+        if content is None:
+            return
+        key = self.make_key(provider, model_version, system_message, user_message)
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses (key, provider, model_version, content, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, provider, str(model_version), content, time.time())
+            )
+            self.connection.commit()
+
+    def invalidate(self, provider: str = None, model_version: str = None) -> int:
+        """Удаляет ответы провайдера и/или модели (без параметров — весь кэш). Возвращает число удаленных"""
+        conditions, params = [], []
+        if provider:
+            conditions.append('provider = ?')
+            params.append(provider)
+        if model_version:
+            conditions.append('model_version = ?')
+            params.append(model_version)
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+
+        with self._lock:
+            cursor = self.connection.execute(f'DELETE FROM responses{where}', params)
+            self.connection.commit()
+            return cursor.rowcount
+
+    def summary(self) -> list[tuple]:
+        """Количество закэшированных ответов по провайдерам и моделям"""
+        with self._lock:
+            return self.connection.execute(
+                'SELECT provider, model_version, COUNT(*) FROM responses GROUP BY provider, model_version'
+            ).fetchall()
+
+    def print_statistics(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0
+        print(f'Кэш ответов LLM: попаданий {self.hits}, промахов {self.misses} ({hit_rate:.1%} попаданий)')
+
+
+_response_cache = None
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Общий кэш ответов LLM процесса (None, если кэш выключен в настройках)"""
+    global _response_cache
+    if not settings.LLM_RESPONSE_CACHE['enabled']:
+        return None
+    if _response_cache is None:
+        _response_cache = LLMResponseCache(os.path.join(settings.OUTPUT_DIR_CACHE, 'llm_responses.sqlite'))
+    return _response_cache
+
+
+# Инвалидация кэша: python -m llm.response_cache --clear [--provider together] [--model-version ...]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Управление кэшем ответов LLM')
+    parser.add_argument('--clear', action='store_true', help='Удалить ответы из кэша')
+    parser.add_argument('--provider', help='Только ответы провайдера (together, openrouter, gigachat)')
+    parser.add_argument('--model-version', help='Только ответы версии модели')
+    args = parser.parse_args()
+
+    cache = LLMResponseCache(os.path.join(settings.OUTPUT_DIR_CACHE, 'llm_responses.sqlite'))
+    if args.clear:
+        deleted = cache.invalidate(args.provider, args.model_version)
+        print(f'Удалено ответов: {deleted}')
+    for provider, model_version, count in cache.summary():
+        print(f'{provider} / {model_version}: {count}')
@@ -1,216 +1,33 @@
-import json
-import re
-import os
-import time
-
-from together import Together
-
 from config.settings import settings
+from llm.base import BaseHotNewsGenerator
+from llm.transport import OpenAICompatibleTransport
 
 
-class TogetherAIHotNewsGenerator:
+class TogetherAIHotNewsGenerator(BaseHotNewsGenerator):
+    provider = 'together'
+
     def __init__(self, api_key, model, model_version):
         """
-        Инициализация с использованием LangChain
+        Клиент Together AI (OpenAI-совместимый API)
 
-        :param credentials: Авторизационные данные (логин/пароль или токен)
+        :param api_key: Ключ API
         """
-        self.model = model
-        self.model_version = model_version
         self.api_key = api_key
-        self.llm = Together(
-            api_key=api_key
-        )
-
-    def generate_topics(self, region: str, category:str, message: str, user_message: str = None, system_message: str = None) -> dict:
-        """
-        Генерация тезисов
-
-        :param user_message: Промт пользователя
-        :param system_message: Системное сообщение (роль модели)
-        :return: Ответ модели
-        """
-
-        if not system_message:
-            system_message = f"""
-            Ты профессиональный аналитик, который умеет вычленять из текста самые важные темы, которые состоят из тезисов, инсайдов и другой крайне интересной информации.
-
-            Требования:  
-            1. Если тезис касается конкретного объекта, в нем ДОЛЖНО быть указано НАЗВАНИЕ ОБЪЕКТА.   
-            2. Тезисы должны быть самодостаточными: по каждому можно понять суть без дополнительной информации.  
-            3. Максимум 3 тезиса, минимум — 0.  
-            4. Тезисы должны быть уникальными по смыслу (без дублирования).  
-            5. Только интересная/значимая информация (не тривиальные факты).  
-            6. ВЫВОДИ пустой json, если вообще нет подходящих тем или во всем тексте прослеживается какая-то реклама продукта.
-            7. В полученных темах ОБЯЗАТЕЛЬНО должно говориться про регион "{region}" и тема "{category}" (другие регионы и темы не интересуют).
-            8. Отвечай строго на русском языке!
-            9. Соблюдай формат вывода JSON без каких-либо рассуждений!
-
-            Формат ответа (JSON):
-                            ```json
-                            {{
-                                "topics": [  
-                                    "<Тезис1>",
-                                    "<Тезис2>",
-                                    "<Тезис3>"
-                                ]
-                            }}
-                             ```
-            """
-
-        if not user_message:
-            user_message = "Проанализируй текст и выдели тезисы.\n Текст: " + message
-
-        messages = [
-            {
-                "role": "system",
-                "content": system_message
-            },
-            {
-                "role": "user",
-                "content": user_message
-            }
-        ]
-
-        try:
-            print(f'Генерируются  тезизы: {message[:100]}...')
-            response = self.llm.chat.completions.create(
-                model=self.model_version,
-                messages=messages,
-                response_format={"type": "json_object"},
-                temperature=0.1,
-                max_tokens=25000
-            )
-            print(f'RESPONSE: {response.choices[0].message.content}')
-            correct_response = self.parse_json_obj_from_llm(response.choices[0].message.content)
-            return correct_response
-        except Exception as e:
-            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
-
-    def clusterization_topics(self, message: str, user_message: str = None, system_message: str = None) -> dict:
-        """
-        Кластеризация тезисов
-
-        :param user_message: Промт пользователя
-        :param system_message: Системное сообщение (роль модели)
-        :return: Ответ модели
-        """
-
-        if not system_message:
-            system_message = """
-            Ты — профессиональный аналитик, специализирующийся на кластеризации тем и их анализе. Тебе на вход подаётся список словарей в формате `list[dict]`, где каждый словарь содержит новостную тему (`topic`) и её вес (`weight`).
-
-            Требования:  
-            1. Кластеризация по смыслу (поле "topics"): Группируй темы, очень близкие по смыслу, в один кластер, а смежные в отдельные.
-            2. Выделение уникальных объектов: Если в теме упоминается конкретный объект, продукт или уникальная сущность (например, "iPhone 15", "Tesla Cybertruck"), выдели его в отдельный кластер.  
-            3. Название кластера (поле "cluster_name"):  
-               - Должно быть кратким (не более 5 слов).  
-            4. Суммаризация тем в кластере (поле "summarize"):
-               - На основе "topics" необхожимо сформировать основные мысли "theme"
-               - Каждая тема в рамках кластера должна быть уникальной
-               - Не должно быть такого, что про какую-то "topics" не рассказывается в "theme"
-               - "theme" должны быть самодостаточными и с законченной мыслью
-               - В одной "theme" не более 3 предложений
-            5. Отвечай строго на русском языке (исключением могут быть латинские наименования чего-либо)!
-            6. Соблюдай формат вывода JSON без каких-либо рассуждений!
-
-            Формат вывода:  
-            Строго выводи ответ в формате списка, где каждый кластер имеет структуру JSON (без Markdown-обрамления):  
-            ```[
-            {
-                "cluster_name": "Название кластера",
-                "summarize": [
-                    {
-                        "theme": "Полный текст суммаризированной темы 1"
-                    }, ...
-                    {
-                        "theme": "Полный текст суммаризированной темы N"
-                    }
-                ]
-                "topics": [
-                    {
-                        "topic": "Полный текст темы 1",
-                        "weight": вес1
-                    }, ... 
-                    {
-                        "topic": "Полный текст темы N",
-                        "weight": весN
-                    } 
-                ]
-            }, ...
-            
-            ]
-            ```
-"""
-
-        if not user_message:
-            user_message = "Список тем: " + message
-
-        messages = [
-            {
-                "role": "system",
-                "content": system_message
-            },
-            {
-                "role": "user",
-                "content": user_message
-            }
-        ]
-
-        try:
-            print(f'Кластеризируются тезисы: {message[:100]}...')
-            response = self.llm.chat.completions.create(
-                model=self.model_version,
-                messages=messages,
-                response_format={"type": "json_object"},
-                temperature=0.1,
-                max_tokens=25000
-            )
-            print(f'RESPONSE: {response.choices[0].message.content}')
-            correct_response = self.parse_json_obj_from_llm(response.choices[0].message.content)
-            return correct_response
-        except Exception as e:
-            raise Exception(f"Ошибка при запросе к {self.model}: {str(e)}")
-
-    @staticmethod
-    def parse_json_obj_from_llm(text: str) -> dict:
-        """
-        Пытается извлечь JSON из ответа LLM.
-        Если не получается — возвращает пустой словарь {}.
-        """
-        if not text:
-            return {}
-
-        try:
-            # 1. Пробуем распарсить как чистый JSON
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-
-        # 2. Чистим markdown-форматирование (```json и ```)
-        cleaned_text = re.sub(r'^```(json)?\n|```$', '', text.strip(), flags=re.MULTILINE)
-        cleaned_text = cleaned_text.strip()
-
-        # 3. Пробуем распарсить очищенный текст
-        try:
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError:
-            pass
-
-        # 4. Пытаемся найти JSON в подстроке
-        try:
-            json_match = re.search(r'\{[\s\S]*?\}', cleaned_text)
-            if json_match:
-                return json.loads(json_match.group(0))
-        except (json.JSONDecodeError, AttributeError):
-            pass
-
-        # 5. Если всё провалилось — возвращаем {} вместо ошибки
-        return {}
+        super().__init__(model, model_version, OpenAICompatibleTransport(
+            base_url="https://api.together.xyz/v1",
+            api_key=api_key,
+            response_format={"type": "json_object"},
+            temperature=0.1,
+            max_tokens=25000
+        ))
 
 
 # Пример использования
 if __name__ == "__main__":
+    # Нужны только для проверочного запуска
+    import json
+    import os
+    import time
 
     api_key = settings.AUTHENTICATION['TOGETHER_API_KEY']
     model = 'Deepseek'
@@ -0,0 +1,232 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from openai import OpenAI
+
+from config.settings import settings
+
+
+@dataclass
+class Completion:
+    """Ответ модели и сведения о вызове"""
+    content: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    time_to_first_token: Optional[float] = None  # Секунд до первого фрагмента ответа (только в потоке)
+    stopped_early: bool = False  # Поток закрыт сразу после завершения JSON
+
+
+class JsonCompletionDetector:
+    """
+    Определяет по фрагментам потока, что JSON верхнего уровня в ответе закрыт.
+
+    JSON отслеживается, только если ответ с него начинается: после рассуждений (<think>...</think>)
+    и необязательного ограждения ```json. Если перед JSON есть текст (в нем тоже бывают скобки) или
+    закрытый фрагмент не разбирается как JSON, поток читается до конца.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.depth = 0
+        self.started = False
+        self.disabled = False  # Ответ не начинается с JSON: поток не обрываем
+        self.in_string = False
+        self.escaped = False
+        self.start = None  # Позиция открывающей скобки
+        self.end = None  # Позиция сразу после закрывающей скобки
+
+    def feed(self, text: str) -> bool:
+        if self.end is not None:
+            return True
+        self.buffer += text
+        if self.disabled:
+            return False
+
+        buffer = self.buffer
+        if not self.started:
+            started = self._find_start()
+            if started is None:
+                return False
+            if not started:
+                self.disabled = True
+                return False
+
+        while self.position < len(buffer):
+            char = buffer[self.position]
+            self.position += 1
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        json.loads(buffer[self.start:self.position])
+                    except ValueError:
+                        self.disabled = True
+                        return False
+                    self.end = self.position
+                    return True
+        return False
+
+    def _find_start(self) -> Optional[bool]:
+        """
+        Ищет открывающую скобку JSON в начале ответа.
+
+        True — JSON начался, False — ответ начинается не с JSON, None — фрагментов пока мало для решения
+        """
+        buffer = self.buffer
+        position = self._skip_spaces(self.position)
+
+        if buffer.startswith('<think>', position):
+            close = buffer.find('</think>', position)
+            if close == -1:
+                return None
+            position = self._skip_spaces(close + len('</think>'))
+        elif '<think>'.startswith(buffer[position:]):
+            return None
+
+        if buffer.startswith('```', position):
+            line_end = buffer.find('\n', position)
+            if line_end == -1:
+                return None
+            if buffer[position + 3:line_end].strip().lower() not in ('', 'json'):
+                return False
+            position = self._skip_spaces(line_end + 1)
+        elif '```'.startswith(buffer[position:]):
+            return None
+
+        if position >= len(buffer):
+            self.position = position
+            return None
+        if buffer[position] not in '{[':
+            return False
+
+        self.started = True
+        self.start = position
+        self.depth = 1
+        self.position = position + 1
+        return True
+
+    def _skip_spaces(self, position: int) -> int:
+        while position < len(self.buffer) and self.buffer[position].isspace():
+            position += 1
+        return position
+
+
+class Transport:
+    """Способ доставки запроса к модели. Провайдеры отличаются только транспортом"""
+
+    def complete(self, model_version: str, system_message: str, user_message: str) -> Completion:
+        raise NotImplementedError
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Общий пул HTTP-соединений с keep-alive для всех OpenAI-совместимых провайдеров"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            options = settings.LLM_TRANSPORT
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=options['max_connections'],
+                    max_keepalive_connections=options['max_connections'],
+                    keepalive_expiry=options['keepalive_expiry']
+                ),
+                timeout=httpx.Timeout(options['timeout'], connect=10)
+            )
+        return _http_client
+
+
+class OpenAICompatibleTransport(Transport):
+    """
+    Транспорт для OpenAI-совместимых API (Together AI, OpenRouter).
+
+    В потоковом режиме чтение прекращается, как только JSON ответа закрыт: хвост ответа
+    (пояснения модели после JSON) не ждем.
+    """
+
+    def __init__(self, base_url: str, api_key: str, stream: bool = None, **options):
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=get_http_client())
+        self.stream = settings.LLM_TRANSPORT['stream'] if stream is None else stream
+        self.options = options  # Параметры запроса провайдера (temperature, response_format, ...)
+
+    def complete(self, model_version: str, system_message: str, user_message: str) -> Completion:
+        messages = [
+            {
+                "role": "system",
+                "content": system_message
+            },
+            {
+                "role": "user",
+                "content": user_message
+            }
+        ]
+
+        if not self.stream:
+            response = self.client.chat.completions.create(model=model_version, messages=messages, **self.options)
+            usage = response.usage
+            return Completion(
+                content=response.choices[0].message.content,
+                prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                completion_tokens=getattr(usage, 'completion_tokens', None)
+            )
+
+        started_at = time.perf_counter()
+        stream = self.client.chat.completions.create(
+            model=model_version,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self.options
+        )
+        stop_on_json = settings.LLM_TRANSPORT['stop_on_json_complete']
+        detector = JsonCompletionDetector()
+        parts, usage, time_to_first_token, stopped_early = [], None, None, False
+        try:
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - started_at
+                parts.append(delta)
+                if stop_on_json and detector.feed(delta):
+                    stopped_early = True
+                    break
+        finally:
+            stream.close()
+
+        content = ''.join(parts)
+        if stopped_early:
+            content = content[:detector.end]
+        return Completion(
+            content=content,
+            prompt_tokens=getattr(usage, 'prompt_tokens', None),
+            completion_tokens=getattr(usage, 'completion_tokens', None),
+            time_to_first_token=time_to_first_token,
+            stopped_early=stopped_early
+        )
+
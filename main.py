@@ -1,22 +1,18 @@
-import ast
-import json
-import os
 import time
-from datetime import datetime, timezone, timedelta, date
+from datetime import datetime, timezone, date
+from functools import partial
 
-from tqdm import tqdm
-
-from llm.google_client import GoogleGenAIHotNewsGenerator
 # from llm.openrouter_client import OpenrouterHotNewsGenerator
-from llm.gigachat_client import GigaChatHotNewsGenerator
-import pandas as pd
+# from llm.gigachat_client import GigaChatHotNewsGenerator
 from config.settings import settings
 import warnings
 
 from llm.together_ai_client import TogetherAIHotNewsGenerator
 from tools.archiver import create_archives
 from tools.email_sender import send_archives_via_gmail
-from tools.raw_data import get_raw_data
+from tools.raw_data import save_raw_data
+from tools.scheduler import SweepScheduler
+from tools.sharded_sweep import run_sharded
 
 warnings.filterwarnings("ignore")  # Отключает все warnings
 
@@ -45,26 +41,30 @@ model = 'Deepseek'
 model_version = 'Qwen/Qwen3-32B-FP8'  # Очень долго генерирует, но сама генерация вроде бы норм
 llm = TogetherAIHotNewsGenerator(api_key=api_key, model=model, model_version=model_version)
 
-for region in regions:
-    start_time_region = time.time()
 
-    for category in categories:
-        print(f'***************** {region} ({regions.index(region)+1}/{len(regions)}) / {category} ({categories.index(category)+1}/{len(categories)})  ***************** ')
-        # Шаг 1. Подготовка сырых данных
-        raw_data = get_raw_data(
+# Шаг 1. Подготовка сырых данных (все пары регион/категория обрабатываются параллельно).
+# Повторный запуск продолжает обход по журналу: готовые пары пропускаются (resume=False — обход заново)
+if settings.SHARDED_SWEEP['workers'] > 1 or settings.SHARDED_SWEEP['nodes'] > 1:
+    # Пары разбираются из общей очереди несколькими процессами (и машинами), каждый со своим пулом браузеров
+    run_sharded(
+        sources=sources,
+        regions=regions,
+        categories=categories,
+        period=period,
+        to_excel=to_excel,
+        month_begin=month_begin,
+        month_begin_utc=month_begin_utc)
+else:
+    scheduler = SweepScheduler(
                                 sources=sources,
-                                category=category,
-                                region=region,
+                                regions=regions,
+                                categories=categories,
                                 period=period,
                                 to_excel=to_excel,
                                 month_begin=month_begin,
                                 month_begin_utc=month_begin_utc,
-                                max_concurrent=5)
-
-        del raw_data['url']
-        raw_data.to_excel(os.path.join(settings.OUTPUT_DIR_RAW, f'RAW_{category}_{region}_{period}_{month_begin}.xlsx'), index=False)
-    end_time_region = time.time()
-    print(f'Время затраченное на регион {region}: {round((end_time_region - start_time_region) / 60, 2)} мин.')
+                                on_pair_done=partial(save_raw_data, period=period, month_begin=month_begin))
+    scheduler.run()
 
 # Архивация всех эксель
 create_archives(
@@ -93,14 +93,22 @@ sent_files = send_archives_via_gmail(
 
         # raw_data.to_csv(os.path.join(settings.OUTPUT_DIR_RAW, f'RAW_{category}_{region}_{period}_{month_begin}.csv'), index=False, encoding='utf-8', sep=';')
 
+        # Для шагов 2-4:
+        # import json
+        # import os
+        # import pandas as pd
+        # from tools.near_duplicates import drop_near_duplicates
+        # from tools.storage import load_frame
+        # from tools.topic_clustering import extract_topics, clusterization_topics_local
+
         # Шаг 2. Генерация тем из текстов
         # print('**** ГЕНЕРАЦИЯ ТЕМ ИЗ ТЕКСТОВ ****')
-        # data_topics = pd.read_excel(os.path.join(settings.OUTPUT_DIR_RAW, f'RAW_{category}_{region}_{period}_{month_begin}.xlsx'))
+        # data_topics = load_frame(settings.OUTPUT_DIR_RAW, f'RAW_{category}_{region}_{period}_{month_begin}')
+        # Почти одинаковые тексты (размечены при обходе) отправляются в LLM по одному разу
+        # data_topics = drop_near_duplicates(data_topics)
         # data_topics['model'] = model
-        # tqdm.pandas()
-        # data_topics['topics'] = data_topics['raw_data'].progress_apply(
-        #     lambda x: llm.generate_topics(region, category, x) if pd.notna(x) else None
-        # )
+        # Тезисы генерируются только для новых и измененных текстов, остальные берутся из кэша этапов
+        # data_topics['topics'] = llm.generate_topics_incremental(region, category, data_topics['raw_data'].tolist())
         # data_topics.to_excel(os.path.join(settings.OUTPUT_DIR_TOPICS, f'TOPICS_{category}_{region}_{period}_{month_begin}.xlsx'), index=False)
 
         # Шаг 3. Кластеризация тем
@@ -108,23 +116,8 @@ sent_files = send_archives_via_gmail(
         # data_clusters = pd.read_excel(
         #     os.path.join(settings.OUTPUT_DIR_TOPICS, f'TOPICS_{category}_{region}_{period}_{month_begin}.xlsx'))
         #
-        # topics = []
-        # for _, row in data_clusters.iterrows():
-        #     if row['topics'] != '{}' and row['topics'] != '[]' and pd.notna(row['topics']):
-        #         new_topics = ast.literal_eval(row['topics'])
-        #         if isinstance(new_topics, list) and len(new_topics) != 0:
-        #             new_topics = new_topics[0]
-        #         if isinstance(new_topics, dict):
-        #             if len(new_topics) != 0 and 'topics' in new_topics.keys():
-        #                 for topic in [i for i in [i.strip(' "\'') for i in new_topics['topics']] if
-        #                               i != 'нет информации' and len(i) != 0]:
-        #                     topics.append(
-        #                         {
-        #                             'topic': topic,
-        #                             'weight': 2 if row['approved'] else 1
-        #                         }
-        #                     )
-        # response = llm.clusterization_topics(str(topics))
+        # topics = extract_topics(data_clusters)
+        # response = clusterization_topics_local(llm, topics)
         # print(f'RESPONSE: {response}')
 
         # with open(
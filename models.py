@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 from config.settings import settings
+from tools.region_matcher import get_region_matcher
 
 
 @dataclass
@@ -52,15 +53,8 @@ class NewsItem:
             self.region = ""
             return
 
-        text_lower = self.raw_data.lower()
-
-        # Проверяем все ключевые слова для текущего региона
-        for keyword in settings.REGION_KEYWORDS[region]:
-            if keyword.lower() in text_lower:
-                self.region = region
-                return
-
-        self.region = ""
+        # Общий автомат по ключевым словам всех регионов (результат кэшируется по тексту)
+        self.region = region if region in get_region_matcher().match(self.raw_data) else ""
 
     # def __eq__(self, other):
     #     if isinstance(other, NewsItem):
@@ -3,9 +3,9 @@ from datetime import datetime
 from abc import ABC, abstractmethod
 
 import requests
-from bs4 import BeautifulSoup
 
 from models import NewsItem
+from tools.html_extract import get_extractor
 from tools.normalize_data import clean_text
 
 
@@ -18,8 +18,8 @@ class BaseParser(ABC):
         """Основной метод для парсинга данных из разных источников"""
 
     @abstractmethod
-    def to_excel(self):
-        """Метод позволяет сохранить результат выполнения парсинга в Excel"""
+    def save(self):
+        """Метод сохраняет результат выполнения парсинга в промежуточное хранилище (Parquet)"""
         pass
 
     @abstractmethod
@@ -39,19 +39,10 @@ class BaseParser(ABC):
             response = requests.get(url, headers=headers, timeout=15)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Удаляем ненужные элементы перед извлечением текста
-            for element in soup(
-                    ['script', 'style', 'nav', 'footer', 'iframe', 'noscript', 'svg', 'img', 'button', 'form']):
-                element.decompose()
-
-            # Получаем весь текст из body
-            body = soup.find('body')
-            if not body:
+            full_text = get_extractor().extract(response.text)
+            if not full_text:
                 return "Не удалось найти body на странице"
 
-            full_text = body.get_text(separator='\n', strip=True)
             return clean_text(full_text)
 
         except Exception as e:
@@ -10,6 +10,7 @@ import pandas as pd
 from parsers.base_parser import BaseParser
 from models import NewsItem
 from config.settings import settings
+from tools.storage import save_frame
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 
@@ -33,7 +34,7 @@ class GoogleParser(BaseParser):
         self.raw_data = pd.DataFrame(
             [i.get_full_data_dict() for i in list(set(self.parse(category, region, period, date_from)))])
         if to_excel:
-            self.to_excel()
+            self.save()
 
     def _init_tor_controller(self):
         """Initialize Tor controller connection"""
@@ -148,13 +149,11 @@ class GoogleParser(BaseParser):
 
         return news_items
 
-    def to_excel(self):
-        filepath = os.path.join(settings.OUTPUT_DIR_PROCESSED,
-                                f"{self.class_name}_{self.category}_{self.region}_{self.period}_{self.date_from}.xlsx")
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            self.raw_data.to_excel(writer, index=False)
-            print(f"Data saved to: {filepath}")
-            self.print_statistics()
+    def save(self):
+        filepath = save_frame(self.raw_data, settings.OUTPUT_DIR_PROCESSED,
+                              f"{self.class_name}_{self.category}_{self.region}_{self.period}_{self.date_from}")
+        print(f"Data saved to: {filepath}")
+        self.print_statistics()
 
     def print_statistics(self):
         total = len(self.raw_data)
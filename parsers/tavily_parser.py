@@ -7,6 +7,7 @@ from tavily import TavilyClient
 from parsers.base_parser import BaseParser
 from models import NewsItem
 from config.settings import settings
+from tools.storage import save_frame
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 
@@ -22,17 +23,13 @@ class TavilyParser(BaseParser):
         self.date_from = date_from
         self.raw_data = pd.DataFrame([i.get_full_data_dict() for i in list(set(self.parse(category, region, period, date_from)))])
         if to_excel:
-            self.to_excel()
+            self.save()
 
-    def to_excel(self):
-        # data_df = pd.DataFrame([i.get_full_data_dict() for i in self.raw_data])
-        filepath = os.path.join(settings.OUTPUT_DIR_PROCESSED,
-                                f"{self.class_name}_{self.category}_{self.region}_{self.period}_{self.date_from}.xlsx")
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            self.raw_data.to_excel(writer, index=False)
-
-            print(f"Данные сохранены в файл: {filepath}")
-            self.print_statistics()
+    def save(self):
+        filepath = save_frame(self.raw_data, settings.OUTPUT_DIR_PROCESSED,
+                              f"{self.class_name}_{self.category}_{self.region}_{self.period}_{self.date_from}")
+        print(f"Данные сохранены в файл: {filepath}")
+        self.print_statistics()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def parse(self, category: str, region: str, period: str, date_from: datetime) -> list[NewsItem]:
@@ -1,6 +1,10 @@
 import os
+import json
 import asyncio
+import random
+import threading
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 from dotenv import load_dotenv
 from telethon.sync import TelegramClient
 from telethon.errors import FloodWaitError, ChannelPrivateError
@@ -10,6 +14,121 @@ from parsers.base_parser import BaseParser
 from models import NewsItem
 from config.settings import settings
 from tools.normalize_data import clean_text
+from tools.storage import save_frame, load_frame, frame_path
+
+
+CHANNEL_STORE_COLUMNS = ['channel', 'message_id', 'date_publish', 'raw_data']
+
+
+class TelegramChannelStore:
+    """
+    Хранилище сообщений Telegram на уровне каналов.
+
+    Каждый канал скачивается один раз за запуск, а представления по категориям и регионам строятся
+    из хранилища. Для каждого канала сохраняется верхняя граница (id последнего скачанного сообщения)
+    и дата, начиная с которой история канала полная, поэтому следующие запуски докачивают только новые сообщения.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.channels: dict[str, pd.DataFrame] = {}
+        self.refreshed: set[str] = set()  # Каналы, уже обновленные в этом запуске
+        self._lock = threading.RLock()
+        self.state = self._load_state()
+
+    @staticmethod
+    def _name(channel: str) -> str:
+        return f"Telegram_CHANNEL_{channel}"
+
+    def _state_path(self) -> str:
+        return os.path.join(self.directory, "telegram_channels_state.json")
+
+    def _load_state(self) -> dict:
+        """Верхние границы каналов: {channel: {'max_id': int, 'covered_from': ISO-дата}}"""
+        if not os.path.exists(self._state_path()):
+            return {}
+        with open(self._state_path(), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _save_state(self):
+        with open(self._state_path(), 'w', encoding='utf-8') as file:
+            json.dump(self.state, file, ensure_ascii=False, indent=4)
+
+    def covers(self, channel: str, date_from: datetime) -> bool:
+        """Есть ли в хранилище полная история канала начиная с date_from"""
+        channel_state = self.state.get(channel)
+        return (channel_state is not None
+                and datetime.fromisoformat(channel_state['covered_from']) <= date_from
+                and os.path.exists(frame_path(self.directory, self._name(channel))))
+
+    def high_water_mark(self, channel: str) -> int:
+        """id последнего скачанного сообщения канала (0, если канал не скачивался)"""
+        return self.state.get(channel, {}).get('max_id', 0)
+
+    def needs_fetch(self, channel: str, date_from: datetime) -> bool:
+        """Нужно ли обращаться к Telegram за сообщениями канала"""
+        if not self.covers(channel, date_from):
+            return True
+        return settings.TELEGRAM_INCREMENTAL and channel not in self.refreshed
+
+    def load(self, channel: str) -> Optional[pd.DataFrame]:
+        """Все сообщения канала из памяти или с диска (None, если канал еще не скачан)"""
+        with self._lock:
+            if channel in self.channels:
+                return self.channels[channel]
+
+            channel_data = load_frame(self.directory, self._name(channel))
+            if channel_data is None:
+                return None
+
+            self.channels[channel] = channel_data
+            return channel_data
+
+    def window(self, channel: str, date_from: datetime) -> Optional[pd.DataFrame]:
+        """Сообщения канала, опубликованные после date_from"""
+        channel_data = self.load(channel)
+        if channel_data is None:
+            return None
+        return channel_data.loc[channel_data['date_publish'] > date_from]
+
+    def append(self, channel: str, messages: list[dict], date_from: datetime):
+        """Добавляет скачанные сообщения канала и сдвигает его верхнюю границу"""
+        new_data = pd.DataFrame(messages, columns=CHANNEL_STORE_COLUMNS)
+        new_data['date_publish'] = pd.to_datetime(new_data['date_publish'], utc=True)
+
+        with self._lock:
+            if self.covers(channel, date_from):
+                # Докачка: история до date_from уже есть
+                covered_from = self.state[channel]['covered_from']
+                channel_data = pd.concat([new_data, self.load(channel)], ignore_index=True)
+                channel_data = channel_data.drop_duplicates(subset=['message_id'], keep='first')
+            else:
+                covered_from = date_from.isoformat()
+                channel_data = new_data
+
+            channel_data = channel_data.sort_values('message_id', ascending=False, ignore_index=True)
+            self.channels[channel] = channel_data
+
+            save_frame(channel_data, self.directory, self._name(channel))
+
+            max_id = int(channel_data['message_id'].max()) if len(channel_data) else 0
+            self.state[channel] = {
+                'max_id': max(max_id, self.high_water_mark(channel)),
+                'covered_from': covered_from
+            }
+            self._save_state()
+            self.refreshed.add(channel)
+
+
+_channel_store = None
+
+
+def get_channel_store() -> TelegramChannelStore:
+    """Общее хранилище каналов процесса"""
+    global _channel_store
+    if _channel_store is None:
+        _channel_store = TelegramChannelStore(settings.OUTPUT_DIR_PROCESSED)
+    return _channel_store
 
 
 class TelegramParser(BaseParser):
@@ -24,21 +143,21 @@ class TelegramParser(BaseParser):
         self.raw_data = pd.DataFrame([i.get_full_data_dict() for i in self.parse(category, region, period, date_from)])
 
         if to_excel:
-            self.to_excel()
+            self.save()
 
-    def to_excel(self):
+    def save(self):
         data_df = self.raw_data
         data_df['date_from'] = data_df['date_from'].dt.tz_localize(None)
         data_df['date_publish'] = data_df['date_publish'].dt.tz_localize(None)
         # data_df = data_df.loc[data_df['region'] == self.region]
-        filepath = os.path.join(settings.OUTPUT_DIR_PROCESSED,
-                                f"{self.class_name}_{self.category}_BASE_{self.period}_{self.date_from}.xlsx")
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            data_df.to_excel(writer, index=False)
-            print(f"Данные сохранены в файл: {filepath}")
-            self.print_statistics()
-
-    async def _get_channel_messages(self, channel_username, period, date_from, region, category):
+        filepath = save_frame(data_df, settings.OUTPUT_DIR_PROCESSED,
+                              f"{self.class_name}_{self.category}_BASE_{self.period}_{self.date_from}")
+        print(f"Данные сохранены в файл: {filepath}")
+        self.print_statistics()
+
+    @staticmethod
+    async def _connect_client() -> TelegramClient:
+        """Создает и подключает клиент Telegram, общий для всех каналов"""
         load_dotenv()
 
         # Настройки клиента
@@ -47,35 +166,44 @@ class TelegramParser(BaseParser):
         phone = settings.AUTHENTICATION['PHONE_NUM']
         session_name = os.getenv('SESSION_NAME', 'default_session')
 
-        async with TelegramClient(session_name, api_id, api_hash) as client:
-            await client.start(phone)
+        client = TelegramClient(session_name, api_id, api_hash)
+        await client.start(phone)
+        return client
 
+    async def _get_channel_messages(self, client, channel_username, date_from,
+                                    min_id: int = 0) -> Optional[list[dict]]:
+        """Скачивает сообщения канала новее date_from и min_id (id последнего уже скачанного сообщения)"""
+        for attempt in range(1, settings.TELEGRAM_FLOOD_RETRIES + 1):
             try:
                 channel = await client.get_entity(channel_username)
 
                 messages = []
-                async for message in client.iter_messages(channel):
+                async for message in client.iter_messages(channel, min_id=min_id):
                     if message.date > date_from:
                         if message.text:
-                            messages.append(
-                                NewsItem(
-                                    # region=self._identification_region(region, message.text),
-                                    category=category,
-                                    region='Undefined',
-                                    period=period,
-                                    source=self.class_name,
-                                    url=f"https://t.me/s/{channel_username}",
-                                    approved=any(source in channel_username for source in settings.TELEGRAM_CHANNELS[category]['approved']),
-                                    # title=self.get_title(message.text),
-                                    date_from=date_from,
-                                    date_publish=message.date,
-                                    raw_data=clean_text(message.text)
-                                ))
+                            messages.append({
+                                'channel': channel_username,
+                                'message_id': message.id,
+                                'date_publish': message.date,
+                                'raw_data': clean_text(message.text)
+                            })
                     else:
                         break
 
                 return messages
 
+            except FloodWaitError as e:
+                # Слишком долгое ожидание — канал пропускается до следующего запуска
+                if e.seconds > settings.TELEGRAM_MAX_FLOOD_WAIT:
+                    print(f"FloodWait в канале {channel_username}: требуется {e.seconds} сек., "
+                          f"больше {settings.TELEGRAM_MAX_FLOOD_WAIT} — канал пропущен")
+                    return None
+                # Ждем только этот канал, остальные продолжают скачиваться. Не меньше, чем требует Telegram
+                # (иначе сразу новый FloodWait), с разбросом, чтобы каналы не повторяли запросы одновременно
+                wait = e.seconds + random.uniform(1, 5 * attempt)
+                print(f"FloodWait в канале {channel_username}: ждем {wait:.0f} сек. "
+                      f"(попытка {attempt}/{settings.TELEGRAM_FLOOD_RETRIES})")
+                await asyncio.sleep(wait)
             except ChannelPrivateError:
                 print(f"Ошибка: Канал {channel_username} приватный или у вас нет доступа.")
                 return None
@@ -83,18 +211,74 @@ class TelegramParser(BaseParser):
                 print(f"Ошибка в канале {channel_username}: {e}")
                 return None
 
+        print(f"Канал {channel_username} пропущен после {settings.TELEGRAM_FLOOD_RETRIES} FloodWait")
+        return None
+
+    def _project_messages(self, channel_data: pd.DataFrame, channel_username, period, date_from,
+                          category) -> list[NewsItem]:
+        """Представление сообщений канала из хранилища для конкретной категории"""
+        approved = any(source in channel_username for source in settings.TELEGRAM_CHANNELS[category]['approved'])
+        return [
+            NewsItem(
+                category=category,
+                region='Undefined',
+                period=period,
+                source=self.class_name,
+                url=f"https://t.me/s/{channel_username}",
+                approved=approved,
+                date_from=date_from,
+                date_publish=row.date_publish,
+                raw_data=row.raw_data
+            )
+            for row in channel_data.itertuples(index=False)
+        ]
+
+    async def _fetch_channel(self, client, channel, date_from, store, semaphore) -> tuple:
+        """
+        Возвращает сообщения канала за окно из хранилища, при необходимости докачивая новые.
+
+        Результат: (сообщения канала, количество скачанных сообщений или None, если к Telegram не обращались)
+        """
+        if not store.needs_fetch(channel, date_from):
+            return store.window(channel, date_from), None
+
+        # Если история канала в хранилище полная, забираем только сообщения новее верхней границы
+        min_id = store.high_water_mark(channel) if store.covers(channel, date_from) else 0
+        async with semaphore:
+            messages = await self._get_channel_messages(client, channel, date_from, min_id)
+
+        if messages is None:
+            # Не удалось обновить канал — используем то, что уже есть в хранилище
+            return store.window(channel, date_from) if store.covers(channel, date_from) else None, None
+
+        store.append(channel, messages, date_from)
+        return store.window(channel, date_from), len(messages)
+
     async def _process_channels(self, channel_list, period, date_from, region, category):
         all_messages = []
+        store = get_channel_store()
+        semaphore = asyncio.Semaphore(settings.TELEGRAM_MAX_CONCURRENT_CHANNELS)
+
+        # Клиент подключаем один раз и только если есть каналы, которые нужно скачать
+        client = None
+        if any(store.needs_fetch(channel, date_from) for channel in channel_list):
+            client = await self._connect_client()
 
-        for channel in channel_list:
-            print(f"    CHANNEL {channel}: ", end='')
-            messages = await self._get_channel_messages(channel, period, date_from, region, category)
+        try:
+            results = await asyncio.gather(*(
+                self._fetch_channel(client, channel, date_from, store, semaphore) for channel in channel_list
+            ))
+        finally:
+            if client:
+                await client.disconnect()
 
-            if messages:
-                all_messages.extend(messages)
-                print(f"{len(messages)} сообщений")
+        for channel, (channel_data, fetched) in zip(channel_list, results):
+            if channel_data is not None and len(channel_data):
+                all_messages.extend(self._project_messages(channel_data, channel, period, date_from, category))
+                source = '(из хранилища) ' if fetched is None else f'(скачано {fetched}) '
+                print(f"    CHANNEL {channel}: {source}{len(channel_data)} сообщений")
             else:
-                print(f"Не удалось получить сообщения из {channel}")
+                print(f"    CHANNEL {channel}: Не удалось получить сообщения из {channel}")
 
         return all_messages
 
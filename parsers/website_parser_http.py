@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import chardet
+import httpx
+
+from config.settings import settings
+from parsers.website_parser_playwright import WebsiteParser
+from tools.host_scheduler import FetchTiming
+
+# Признаки страниц, которые без JavaScript не показывают содержимое
+JS_REQUIRED_MARKERS = re.compile(
+    r'enable javascript|javascript is (disabled|required)|включите javascript|требуется javascript',
+    re.IGNORECASE
+)
+
+# Причины, по которым HTTP не дал текста (против домена считаются HTTP_FAILED и подтвержденный HTTP_SHORT_TEXT)
+HTTP_FAILED = 'failed'  # Ошибка соединения, отказ сервера (401, 403, 429, 5xx), скрипты, битая кодировка
+HTTP_NOT_HTML = 'not_html'  # Не HTML-страница (PDF, картинка) — о домене ничего не говорит
+HTTP_PAGE_ERROR = 'page_error'  # Другие коды ответа (404, 410, ...) — ошибка самой страницы, не домена
+HTTP_SHORT_TEXT = 'short_text'  # Короткий текст — против домена, только если браузер получил больше
+
+
+class DomainStrategy:
+    """
+    Память о том, какой способ загрузки нужен домену: HTTP-запроса хватает или нужен браузер.
+
+    Сохраняется между запусками (JSON в каталоге кэша). Домен переводится на браузер, если HTTP
+    не дал пригодного текста browser_after_failures раз подряд. Сайты меняются, поэтому домен на браузере
+    снова пробуется по HTTP каждые reprobe_every страниц или раз в reprobe_interval секунд.
+    """
+
+    def __init__(self, path: str, browser_after_failures: int, reprobe_every: int, reprobe_interval: float):
+        self.path = path
+        self.browser_after_failures = browser_after_failures
+        self.reprobe_every = reprobe_every
+        self.reprobe_interval = reprobe_interval
+        self._lock = threading.Lock()
+        self.domains: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.domains = json.load(file)
+
+    @staticmethod
+    def domain(url: str) -> str:
+        host = (urlsplit(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def needs_browser(self, url: str) -> bool:
+        """Загружать ли страницу сразу в браузере (False и для пробной HTTP-загрузки домена на браузере)"""
+        with self._lock:
+            state = self.domains.get(self.domain(url))
+            if not state or state.get('path') != 'browser':
+                return False
+            state['browser_pages'] = state.get('browser_pages', 0) + 1
+            now = time.time()
+            if state['browser_pages'] >= self.reprobe_every or now - state.get('probed_at', 0) >= self.reprobe_interval:
+                state['browser_pages'] = 0
+                state['probed_at'] = now
+                return False
+            return True
+
+    def record(self, url: str, http_ok: bool):
+        with self._lock:
+            state = self.domains.setdefault(self.domain(url), {'path': 'http', 'http_failures': 0})
+            if http_ok:
+                state['path'] = 'http'
+                state['http_failures'] = 0
+            else:
+                state['http_failures'] += 1
+                if state['http_failures'] >= self.browser_after_failures and state['path'] != 'browser':
+                    state['path'] = 'browser'
+                    state['browser_pages'] = 0
+                    state['probed_at'] = time.time()
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as file:
+                json.dump(self.domains, file, ensure_ascii=False, indent=2)
+
+
+class HttpFirstParser:
+    """
+    Загрузка страниц сначала обычным HTTP-запросом, браузер — только если это не сработало.
+
+    Большинству новостных статей JavaScript не нужен, а рендеринг в браузере на порядок дороже.
+    HTTP-запросы идут через общий пул соединений, кодировка определяется по заголовкам или chardet,
+    качество текста проверяется как в Selenium-парсере (_has_broken_encoding). Домены, которым нужен
+    браузер, запоминаются и дальше сразу отправляются в пул браузеров.
+    """
+
+    def __init__(self, browser: WebsiteParser, max_connections: int = None, timeout: float = None,
+                 min_text_length: int = None, browser_after_failures: int = None):
+        options = settings.HTTP_FETCH
+        self.browser = browser
+        self.max_connections = max_connections or options['max_connections']
+        self.timeout = timeout or options['timeout']
+        self.min_text_length = min_text_length or options['min_text_length']
+        self.strategy = DomainStrategy(
+            os.path.join(settings.OUTPUT_DIR_CACHE, 'fetch_domains.json'),
+            browser_after_failures or options['browser_after_failures'],
+            options['reprobe_every'],
+            options['reprobe_interval']
+        )
+        self.client = None
+
+        # Статистика
+        self.http_pages = 0
+        self.browser_pages = 0
+        self.browser_fallbacks = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=self.timeout,
+            follow_redirects=True,
+            verify=False,
+            headers={
+                'User-Agent': self.browser._generate_user_agent(),
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.5',
+                'Referer': 'https://www.google.com/'
+            }
+        )
+
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+        self.strategy.save()
+        self.print_statistics()
+
+    async def parse(self, url: str, timing: FetchTiming = None) -> Optional[str]:
+        """Текст страницы: по HTTP, при неудаче — в браузере (timing отмечает только последнюю попытку)"""
+        if self.strategy.needs_browser(url):
+            self.browser_pages += 1
+            return await self.browser.parse(url, timing)
+
+        content, failure = await self._parse_with_http(url, timing)
+        if content is not None:
+            self.strategy.record(url, http_ok=True)
+            self.http_pages += 1
+            return content
+        if failure == HTTP_FAILED:
+            self.strategy.record(url, http_ok=False)
+
+        self.browser_fallbacks += 1
+        self.browser_pages += 1
+        content = await self.browser.parse(url, timing)
+        if failure == HTTP_SHORT_TEXT and content and len(content) >= self.min_text_length:
+            # Текст рисуется скриптами: браузер получил то, чего не дал HTTP
+            self.strategy.record(url, http_ok=False)
+        return content
+
+    async def _parse_with_http(self, url: str, timing: FetchTiming = None) -> tuple[Optional[str], Optional[str]]:
+        """Текст страницы по HTTP и причина неудачи (одна из HTTP_*, None при успехе)"""
+        if timing:
+            timing.start()
+        try:
+            response = await self.client.get(url)
+        except httpx.HTTPError:
+            return None, HTTP_FAILED
+        finally:
+            if timing:
+                timing.finish()
+
+        if response.status_code in (401, 403, 429) or response.status_code >= 500:
+            return None, HTTP_FAILED
+        if response.status_code != 200:
+            return None, HTTP_PAGE_ERROR
+        content_type = response.headers.get('content-type', '')
+        if content_type and 'html' not in content_type:
+            return None, HTTP_NOT_HTML
+
+        html = self._decode(response)
+        if JS_REQUIRED_MARKERS.search(html[:20000]) and len(html) < 100_000:
+            return None, HTTP_FAILED
+
+        text = await asyncio.to_thread(self.browser._clean_content, html)
+        if self._has_broken_encoding(text):
+            return None, HTTP_FAILED
+        if len(text) < self.min_text_length:
+            return None, HTTP_SHORT_TEXT
+        return text, None
+
+    @staticmethod
+    def _decode(response: httpx.Response) -> str:
+        """Декодирование по кодировке из заголовков, иначе по chardet"""
+        encoding = response.charset_encoding
+        if not encoding:
+            encoding = chardet.detect(response.content[:50000])['encoding'] or 'utf-8'
+        try:
+            return response.content.decode(encoding, errors='replace')
+        except LookupError:
+            return response.content.decode('utf-8', errors='replace')
+
+    @staticmethod
+    def _has_broken_encoding(text: str) -> bool:
+        """Проверяет текст на признаки битой кодировки"""
+        # Проверка на replacement character (�)
+        if '�' in text:
+            return True
+
+        # Проверка на нечитаемые последовательности (кириллица в utf-8)
+        if re.search(r'[ÐÂðâÐð][\x80-\xBF]', text):
+            return True
+
+        # Проверка на странные сочетания символов
+        unusual_chars = re.findall(r'[^\w\s.,!?@#$%^&*()_+\-=;:\'"<>/\\|{}\[\]`~«»—–…№]', text)
+        if len(unusual_chars) > len(text) * 0.1:  # Если больше 10% странных символов
+            return True
+
+        return False
+
+    def print_statistics(self):
+        browser_domains = sum(1 for state in self.strategy.domains.values() if state.get('path') == 'browser')
+        print(f'Загрузка страниц: по HTTP {self.http_pages}, в браузере {self.browser_pages} '
+              f'(из них после неудачи HTTP {self.browser_fallbacks}), доменов только через браузер: {browser_domains}')
@@ -231,15 +231,20 @@
 
 
 import asyncio
+from collections import Counter
+from urllib.parse import urlsplit
+
 import pandas as pd
 from typing import List, Optional
 from tqdm.asyncio import tqdm_asyncio
-from bs4 import BeautifulSoup
-import re
 from playwright.async_api import async_playwright
 import random
 import async_timeout
 
+from config.settings import settings
+from tools.html_extract import extract_text, remove_sensitive_and_urls
+from tools.host_scheduler import FetchTiming
+
 
 class WebsiteParser:
     def __init__(self, headless: bool = True, timeout: int = 10000, process_timeout: int = 15000):
@@ -250,6 +255,13 @@ class WebsiteParser:
         self.context = None
         self.playwright = None
 
+        # Профиль перехвата запросов: тексту не нужны картинки, шрифты, стили и счетчики
+        self.interception = settings.BROWSER_INTERCEPTION
+        self.blocked_types = set(self.interception['blocked_resource_types'])
+        self.blocked_domains = tuple(self.interception['blocked_domains'])
+        self.scroll_domains = tuple(self.interception['scroll_domains'])
+        self.blocked_requests = Counter()  # Тип ресурса -> количество отклоненных запросов
+
     async def __aenter__(self):
         await self.start()
         return self
@@ -260,17 +272,62 @@ class WebsiteParser:
     async def start(self):
         """Инициализация Playwright"""
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
+        self.browser = await self._launch_browser()
+        self.context = await self._new_context(self.browser)
+
+    async def _launch_browser(self):
+        """Запуск нового экземпляра Chromium"""
+        return await self.playwright.chromium.launch(
             headless=self.headless,
             args=[
                 "--disable-blink-features=AutomationControlled",
                 "--start-maximized"
             ]
         )
-        self.context = await self.browser.new_context(
+
+    async def _new_context(self, browser):
+        """Создание нового контекста браузера"""
+        context = await browser.new_context(
             viewport={'width': 1920, 'height': 1080},
             user_agent=self._generate_user_agent()
         )
+        if self.interception['enabled']:
+            await context.route('**/*', self._route)
+        return context
+
+    @staticmethod
+    def _matches_domain(url: str, domains: tuple) -> bool:
+        host = (urlsplit(url).hostname or '').lower()
+        return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+    async def _route(self, route):
+        """Отклоняет тяжелые ресурсы и счетчики, остальные запросы пропускает"""
+        request = route.request
+        try:
+            if request.resource_type in self.blocked_types:
+                self.blocked_requests[request.resource_type] += 1
+                await route.abort()
+            elif self._matches_domain(request.url, self.blocked_domains):
+                self.blocked_requests['tracker'] += 1
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            # Страница могла закрыться, пока запрос ждал обработки
+            pass
+
+    def _needs_scroll(self, url: str) -> bool:
+        """Прокрутка нужна только доменам, которые догружают текст при прокрутке"""
+        return self.interception['scroll_by_default'] or self._matches_domain(url, self.scroll_domains)
+
+    def print_interception_statistics(self):
+        if not self.blocked_requests:
+            return
+        sizes = self.interception['average_resource_kb']
+        saved_kb = sum(count * sizes.get(kind, 0) for kind, count in self.blocked_requests.items())
+        details = ', '.join(f'{kind}: {count}' for kind, count in self.blocked_requests.most_common())
+        print(f'Перехват запросов: отклонено {sum(self.blocked_requests.values())} ({details}), '
+              f'сэкономлено ~{saved_kb / 1024:.1f} МБ (оценка по среднему размеру ресурса)')
 
     async def close(self):
         """Закрытие ресурсов Playwright"""
@@ -280,6 +337,7 @@ class WebsiteParser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        self.print_interception_statistics()
 
     def _generate_user_agent(self) -> str:
         """Генерация случайного User-Agent"""
@@ -290,23 +348,18 @@ class WebsiteParser:
         ]
         return random.choice(agents)
 
-    async def parse(self, url: str) -> Optional[str]:
-        """Асинхронный парсинг страницы с жестким таймаутом"""
+    async def parse(self, url: str, timing: FetchTiming = None) -> Optional[str]:
+        """Асинхронный парсинг страницы с жестким таймаутом (timing — время самой загрузки)"""
         page = None
         try:
-            # Жесткий таймаут на всю операцию парсинга
-            async with async_timeout.timeout(self.process_timeout / 1000):
-                page = await self.context.new_page()
-
-                # Устанавливаем таймаут на навигацию
-                await page.goto(url, timeout=self.timeout, wait_until="domcontentloaded")
-
-                # Минимальная эмуляция поведения
-                await self._minimal_behavior(page)
-
-                # Быстрое получение контента
-                content = await page.content()
-                return self._clean_content(content)
+            page = await self.context.new_page()
+            if timing:
+                timing.start()
+            try:
+                return await self._load_page(page, url)
+            finally:
+                if timing:
+                    timing.finish()
 
         except asyncio.TimeoutError:
             # print(f"Таймаут парсинга: {url}")
@@ -321,6 +374,21 @@ class WebsiteParser:
                 except:
                     pass
 
+    async def _load_page(self, page, url: str) -> Optional[str]:
+        """Загрузка страницы в переданной вкладке и очистка контента"""
+        # Жесткий таймаут на всю операцию парсинга
+        async with async_timeout.timeout(self.process_timeout / 1000):
+            # Устанавливаем таймаут на навигацию
+            await page.goto(url, timeout=self.timeout, wait_until="domcontentloaded")
+
+            # Минимальная эмуляция поведения (только для доменов, которым нужна прокрутка)
+            if self._needs_scroll(url):
+                await self._minimal_behavior(page)
+
+            # Быстрое получение контента, очистка в потоке, чтобы не блокировать цикл событий
+            content = await page.content()
+            return await asyncio.to_thread(self._clean_content, content)
+
     async def _minimal_behavior(self, page):
         """Минимальная эмуляция поведения"""
         try:
@@ -332,37 +400,169 @@ class WebsiteParser:
 
     @staticmethod
     def _remove_sensitive_and_urls(text: str) -> str:
-        # Упрощенная очистка текста
-        url_pattern = r'https?://\S+|www\.\S+'
-        text = re.sub(url_pattern, '', text, flags=re.IGNORECASE)
+        return remove_sensitive_and_urls(text)
 
-        sensitive_words_pattern = r'\b(ИНН|БИК|ОГРН|Паспорт|СНИЛС|КПП|Карта|Телефон|Email)\b'
-        text = re.sub(sensitive_words_pattern, '', text, flags=re.IGNORECASE)
+    def _clean_content(self, html: str) -> str:
+        """Очистка HTML контента экстрактором из настроек (settings.HTML_EXTRACTION)"""
+        return extract_text(html)
 
-        return re.sub(r'\s+', ' ', text).strip()
 
-    def _clean_content(self, html: str) -> str:
-        """Быстрая очистка HTML контента"""
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
+class BrowserPool(WebsiteParser):
+    """
+    Долгоживущий пул браузеров для всего обхода: N браузеров × M контекстов.
 
-            # Удаляем только самые критичные элементы
-            for element in soup(['script', 'style', 'nav', 'footer']):
-                element.decompose()
+    Каждый контекст обслуживается отдельным воркером, который берет URL из ограниченной очереди
+    и переиспользует одну вкладку. Контекст пересоздается после pages_per_context страниц, если он
+    закрылся или не создает вкладки, а также после max_context_failures ошибок подряд. Упавший браузер
+    перезапускается.
+    """
 
-            text = soup.get_text(separator='\n', strip=True)
-            cleaned_lines = []
+    # Признаки ошибок Playwright о закрытой вкладке, контексте или браузере
+    CLOSED_TARGET_MARKERS = ('has been closed', 'Target closed', 'Browser closed')
+
+    def __init__(self, browsers: int = 2, contexts_per_browser: int = 3, pages_per_context: int = 50,
+                 queue_size: int = 100, headless: bool = True, timeout: int = 10000, process_timeout: int = 15000,
+                 max_context_failures: int = 3):
+        super().__init__(headless=headless, timeout=timeout, process_timeout=process_timeout)
+        self.browsers_count = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.pages_per_context = pages_per_context
+        self.max_context_failures = max_context_failures
+        self.queue_size = queue_size
+        self.browsers = []
+        self.queue = None
+        self.workers = []
+        self._browser_locks = []
+
+        # Статистика
+        self.pages_parsed = 0
+        self.pages_failed = 0
+        self.browser_restarts = 0
+        self.context_recycles = 0
 
-            for line in text.splitlines():
-                if line.strip() and len(line.strip()) > 10:  # Фильтруем очень короткие строки
-                    cleaned_line = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', line.strip())
-                    cleaned_lines.append(cleaned_line[:10000])  # Ограничение длины
+    async def start(self):
+        """Запуск браузеров и воркеров"""
+        self.playwright = await async_playwright().start()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._browser_locks = [asyncio.Lock() for _ in range(self.browsers_count)]
+        self.browsers = [await self._launch_browser() for _ in range(self.browsers_count)]
 
-            clean_text = self._remove_sensitive_and_urls('\n'.join(cleaned_lines))
-            return clean_text[:50000]  # Общее ограничение
+        for browser_index in range(self.browsers_count):
+            for _ in range(self.contexts_per_browser):
+                self.workers.append(asyncio.create_task(self._worker(browser_index)))
 
-        except Exception:
-            return ""
+    async def close(self):
+        """Остановка воркеров и закрытие браузеров"""
+        for _ in self.workers:
+            await self.queue.put((None, None, None))
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+        for browser in self.browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if self.playwright:
+            await self.playwright.stop()
+
+        self.print_statistics()
+
+    async def parse(self, url: str, timing: FetchTiming = None) -> Optional[str]:
+        """Ставит URL в очередь пула и ждет результат (timing отмечается, когда вкладка начинает загрузку)"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((url, future, timing))
+        return await future
+
+    async def _get_browser(self, browser_index: int):
+        """Возвращает живой браузер, при необходимости перезапуская упавший"""
+        async with self._browser_locks[browser_index]:
+            browser = self.browsers[browser_index]
+            if not browser.is_connected():
+                print(f'Браузер #{browser_index} упал, перезапускаем')
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+                browser = await self._launch_browser()
+                self.browsers[browser_index] = browser
+                self.browser_restarts += 1
+            return browser
+
+    @staticmethod
+    async def _close_quietly(resource):
+        if resource:
+            try:
+                await resource.close()
+            except Exception:
+                pass
+
+    async def _worker(self, browser_index: int):
+        """Воркер одного контекста: переиспользует вкладку и восстанавливается после сбоев"""
+        context = None
+        page = None
+        pages_used = 0
+        failures = 0  # Ошибок подряд в текущем контексте
+
+        while True:
+            url, future, timing = await self.queue.get()
+            try:
+                if url is None:
+                    break
+
+                result = None
+                try:
+                    # Пересоздаем контекст: сбрасываем cookies, кэш и накопленную память
+                    if context is None or pages_used >= self.pages_per_context:
+                        await self._close_quietly(context)
+                        context = None
+                        context = await self._new_context(await self._get_browser(browser_index))
+                        page = None
+                        pages_used = 0
+                        failures = 0
+                    if page is None:
+                        page = await context.new_page()
+                except Exception:
+                    # Контекст не создается или не открывает вкладки — на следующем URL создаем новый
+                    self.pages_failed += 1
+                    await self._close_quietly(context)
+                    context = None
+                    page = None
+                else:
+                    try:
+                        pages_used += 1
+                        if timing:
+                            timing.start()
+                        result = await self._load_page(page, url)
+                        self.pages_parsed += 1
+                        failures = 0
+                    except Exception as e:
+                        self.pages_failed += 1
+                        failures += 1
+                        # После сбоя вкладка может остаться в неопределенном состоянии
+                        await self._close_quietly(page)
+                        page = None
+                        closed = any(marker in str(e) for marker in self.CLOSED_TARGET_MARKERS)
+                        if (closed or failures >= self.max_context_failures
+                                or not self.browsers[browser_index].is_connected()):
+                            await self._close_quietly(context)
+                            context = None
+                            self.context_recycles += 1
+
+                if timing:
+                    timing.finish()
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.queue.task_done()
+
+        await self._close_quietly(context)
+
+    def print_statistics(self):
+        print(f'Пул браузеров: обработано страниц {self.pages_parsed}, ошибок {self.pages_failed}, '
+              f'перезапусков браузеров {self.browser_restarts}, пересозданий контекстов после сбоев '
+              f'{self.context_recycles}')
+        self.print_interception_statistics()
 
 
 async def parse_single_url_with_timeout(url: str, parser: WebsiteParser, timeout: int) -> Optional[str]:
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from itertools import chain, zip_longest
+from typing import Awaitable, Callable, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from config.settings import settings
+
+T = TypeVar('T')
+
+
+def host_of(url: str) -> str:
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def interleave_by_host(urls: list[str]) -> list[str]:
+    """Переставляет URL по кругу между хостами, чтобы запросы к одному сайту не шли подряд"""
+    by_host = defaultdict(list)
+    for url in urls:
+        by_host[host_of(url)].append(url)
+    return [url for url in chain.from_iterable(zip_longest(*by_host.values())) if url is not None]
+
+
+class FetchTiming:
+    """
+    Время собственно загрузки страницы.
+
+    Парсер отмечает начало и конец загрузки, поэтому ожидание в очереди пула браузеров и неудачная
+    попытка по HTTP перед браузером не считаются медленным ответом сайта
+    """
+
+    def __init__(self):
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    def latency(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class HostState:
+    """Состояние одного хоста: текущий лимит параллельности и статистика"""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.active = 0
+        self.condition = asyncio.Condition()
+        self.next_start = 0.0
+        self.latencies = deque(maxlen=20)
+        self.decreased_at = float('-inf')  # Когда лимит последний раз уменьшался (time.monotonic)
+
+        # Статистика
+        self.requests = 0
+        self.failures = 0
+        self.decreases = 0
+
+
+class HostScheduler:
+    """
+    Вежливая загрузка сайтов: лимит одновременных запросов на каждый хост и общий лимит на обход.
+
+    Лимит хоста подстраивается по AIMD: успешный быстрый ответ увеличивает его на 1/limit
+    (примерно +1 за «окно» запросов), ошибка или медленный ответ уменьшает вдвое, но не чаще раза
+    за время ответа хоста: несколько ошибок одного «окна» — один сигнал перегрузки. Задержка
+    измеряется только для самой загрузки (FetchTiming), без ожидания свободного браузера. Между стартами
+    запросов к одному хосту выдерживается min_interval. Запрос ждет лимит своего хоста, не занимая
+    общий слот, поэтому медленный сайт не задерживает остальные.
+    """
+
+    def __init__(self, max_total: int = None, initial_per_host: int = None, max_per_host: int = None,
+                 min_interval: float = None, slow_latency: float = None):
+        options = settings.HOST_SCHEDULER
+        self.max_total = max_total or options['max_total']
+        self.initial_per_host = initial_per_host or options['initial_per_host']
+        self.max_per_host = max_per_host or options['max_per_host']
+        self.min_interval = options['min_interval'] if min_interval is None else min_interval
+        self.slow_latency = slow_latency or options['slow_latency']
+        self._global = asyncio.Semaphore(self.max_total)
+        self.hosts: dict[str, HostState] = {}
+
+    def _state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.initial_per_host)
+        return state
+
+    async def run(self, url: str, func: Callable[[FetchTiming], Awaitable[Optional[T]]]) -> Optional[T]:
+        """
+        Выполняет загрузку url в слоте его хоста.
+
+        func получает FetchTiming и отмечает в нем начало и конец загрузки (если не отмечает, задержкой
+        считается все время вызова). Пустой результат (None) или исключение считаются неудачей и
+        уменьшают лимит хоста.
+        """
+        state = self._state(host_of(url))
+        loop = asyncio.get_running_loop()
+
+        async with state.condition:
+            await state.condition.wait_for(lambda: state.active < int(state.limit))
+            state.active += 1
+
+        ok, latency = False, 0.0
+        try:
+            delay = state.next_start - loop.time()
+            state.next_start = max(loop.time(), state.next_start) + self.min_interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            async with self._global:
+                timing = FetchTiming()
+                started_at = time.monotonic()
+                try:
+                    result = await func(timing)
+                finally:
+                    latency = timing.latency()
+                    if latency is None:
+                        latency = time.monotonic() - started_at
+                ok = result is not None
+                return result
+        finally:
+            self._adjust(state, ok, latency)
+            async with state.condition:
+                state.active -= 1
+                state.condition.notify_all()
+
+    def _adjust(self, state: HostState, ok: bool, latency: float):
+        state.requests += 1
+        if ok:
+            state.latencies.append(latency)
+        else:
+            state.failures += 1
+
+        if not ok or latency > self.slow_latency:
+            # Уменьшаем не чаще раза за время ответа хоста (без замеров — за slow_latency)
+            now = time.monotonic()
+            rtt = sum(state.latencies) / len(state.latencies) if state.latencies else self.slow_latency
+            if now - state.decreased_at >= max(rtt, self.min_interval):
+                state.limit = max(1.0, state.limit / 2)
+                state.decreases += 1
+                state.decreased_at = now
+        else:
+            state.limit = min(float(self.max_per_host), state.limit + 1 / state.limit)
+
+    def print_statistics(self):
+        if not self.hosts:
+            return
+        requests = sum(state.requests for state in self.hosts.values())
+        failures = sum(state.failures for state in self.hosts.values())
+        print(f'Планировщик хостов: хостов {len(self.hosts)}, запросов {requests}, '
+              f'неудач {failures} ({failures / requests if requests else 0:.1%})')
+
+        throttled = sorted(self.hosts.items(), key=lambda item: item[1].decreases, reverse=True)[:5]
+        for host, state in throttled:
+            if not state.decreases:
+                break
+            latency = sum(state.latencies) / len(state.latencies) if state.latencies else 0
+            print(f'    {host}: лимит {state.limit:.1f}, снижений {state.decreases}, '
+                  f'неудач {state.failures}/{state.requests}, задержка {latency:.1f} с')
@@ -0,0 +1,225 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+from typing import Optional
+
+from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
+
+from config.settings import settings
+
+
+def remove_sensitive_and_urls(text: str) -> str:
+    # Упрощенная очистка текста
+    url_pattern = r'https?://\S+|www\.\S+'
+    text = re.sub(url_pattern, '', text, flags=re.IGNORECASE)
+
+    sensitive_words_pattern = r'\b(ИНН|БИК|ОГРН|Паспорт|СНИЛС|КПП|Карта|Телефон|Email)\b'
+    text = re.sub(sensitive_words_pattern, '', text, flags=re.IGNORECASE)
+
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class HtmlExtractor:
+    """Извлечение текста из HTML. Реализации отличаются разбором страницы, очистка строк общая"""
+
+    name: str = None
+
+    def __init__(self, max_length: int = None):
+        self.max_length = max_length or settings.HTML_EXTRACTION['max_length']
+
+    def extract(self, html: str) -> str:
+        raise NotImplementedError
+
+    def _finish(self, text: str) -> str:
+        cleaned_lines = []
+        for line in text.splitlines():
+            if line.strip() and len(line.strip()) > 10:  # Фильтруем очень короткие строки
+                cleaned_line = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', line.strip())
+                cleaned_lines.append(cleaned_line[:10000])  # Ограничение длины
+
+        clean_text = remove_sensitive_and_urls('\n'.join(cleaned_lines))
+        return clean_text[:self.max_length]  # Общее ограничение
+
+
+class SoupExtractor(HtmlExtractor):
+    """Прежний способ: полное дерево BeautifulSoup на html.parser"""
+
+    name = 'soup'
+
+    def extract(self, html: str) -> str:
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
+
+            # Удаляем только самые критичные элементы
+            for element in soup(['script', 'style', 'nav', 'footer']):
+                element.decompose()
+
+            return self._finish(soup.get_text(separator='\n', strip=True))
+
+        except Exception:
+            return ""
+
+
+class LxmlExtractor(HtmlExtractor):
+    """
+    Быстрый разбор на lxml (C, отпускает GIL) с поиском основного содержимого страницы.
+
+    Абзацы начисляют очки своему родителю и (вполовину) деду, основным содержимым считается узел
+    с наибольшим счетом с поправкой на долю текста в ссылках — так отсекаются меню, списки
+    материалов и прочий шаблон сайта. Если абзацев нет или основное содержимое намного короче
+    текста всей страницы (min_main_share), берется вся страница. Если и она пуста — прежний SoupExtractor.
+    """
+
+    name = 'lxml'
+    # form и header не удаляются: на части сайтов (ASP.NET) все содержимое страницы лежит внутри <form>
+    REMOVED_TAGS = ('script', 'style', 'nav', 'footer', 'noscript', 'iframe', 'svg', 'button', 'aside', 'template')
+    # Объявление XML: lxml не разбирает строку str с указанной кодировкой
+    XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>', re.IGNORECASE)
+    BLOCK_TAGS = ('p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5',
+                  'h6', 'blockquote', 'pre', 'table', 'tr', 'td', 'th', 'br', 'dd', 'dt', 'figcaption')
+    PARAGRAPH_TAGS = ('p', 'pre', 'blockquote')
+
+    def __init__(self, max_length: int = None, main_content: bool = None, min_main_share: float = None):
+        super().__init__(max_length)
+        options = settings.HTML_EXTRACTION
+        self.main_content = options['main_content'] if main_content is None else main_content
+        self.min_main_share = options['min_main_share'] if min_main_share is None else min_main_share
+        self.fallback = SoupExtractor(max_length)
+
+    def extract(self, html: str) -> str:
+        if not html:
+            return ""
+        try:
+            root = lxml.html.document_fromstring(self.XML_DECLARATION.sub('', html, count=1))
+        except (etree.ParserError, ValueError):
+            return self.fallback.extract(html)
+
+        etree.strip_elements(root, etree.Comment, *self.REMOVED_TAGS, with_tail=False)
+
+        # Переносы строк на границах блоков, строчные элементы остаются в одной строке
+        for element in root.iter(*self.BLOCK_TAGS):
+            element.tail = '\n' + (element.tail or '')
+
+        body = root.find('body')
+        if body is None:
+            body = root
+        text = self._finish(body.text_content())
+        if not text:
+            return self.fallback.extract(html)
+
+        node = self._main_node(root) if self.main_content else None
+        if node is None:
+            return text
+        main_text = self._finish(node.text_content())
+        # Основное содержимое найдено неверно (например, выбран блок с подписью) — берем всю страницу
+        if len(main_text) < len(text) * self.min_main_share:
+            return text
+        return main_text
+
+    def _main_node(self, root) -> Optional[etree.ElementBase]:
+        scores = {}
+        for paragraph in root.iter(*self.PARAGRAPH_TAGS):
+            length = len(paragraph.text_content().strip())
+            if length < 25:
+                continue
+            parent = paragraph.getparent()
+            if parent is None:
+                continue
+            scores[parent] = scores.get(parent, 0) + length
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                scores[grandparent] = scores.get(grandparent, 0) + length / 2
+
+        if not scores:
+            return None
+        return max(scores, key=lambda node: scores[node] * (1 - self._link_density(node)))
+
+    @staticmethod
+    def _link_density(node) -> float:
+        text_length = len(node.text_content())
+        if not text_length:
+            return 1.0
+        link_length = sum(len(link.text_content()) for link in node.iter('a'))
+        return min(link_length / text_length, 1.0)
+
+
+EXTRACTORS = {extractor.name: extractor for extractor in (SoupExtractor, LxmlExtractor)}
+
+_extractors: dict[str, HtmlExtractor] = {}
+_corpus_saved = 0
+
+
+def get_extractor(name: str = None) -> HtmlExtractor:
+    """Экстрактор из настроек (settings.HTML_EXTRACTION['backend']) или по имени"""
+    name = name or settings.HTML_EXTRACTION['backend']
+    if name not in EXTRACTORS:
+        raise ValueError(f'Неизвестный экстрактор HTML: {name}')
+    if name not in _extractors:
+        _extractors[name] = EXTRACTORS[name]()
+    return _extractors[name]
+
+
+def corpus_dir() -> str:
+    return os.path.join(settings.OUTPUT_DIR_CACHE, 'html_corpus')
+
+
+def extract_text(html: str) -> str:
+    """
+    Текст страницы выбранным экстрактором.
+
+    Первые settings.HTML_EXTRACTION['save_corpus'] страниц сохраняются в корпус для сравнения экстракторов.
+    """
+    global _corpus_saved
+    if html and _corpus_saved < settings.HTML_EXTRACTION['save_corpus']:
+        _corpus_saved += 1
+        os.makedirs(corpus_dir(), exist_ok=True)
+        name = hashlib.sha1(html.encode('utf-8', errors='replace')).hexdigest()
+        with open(os.path.join(corpus_dir(), f'{name}.html'), 'w', encoding='utf-8') as file:
+            file.write(html)
+    return get_extractor().extract(html)
+
+
+def benchmark(directory: str):
+    """Сравнение экстракторов на сохраненном корпусе: время на страницу, объем текста, сходство с soup"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            pages.append(file.read())
+    if not pages:
+        print(f'Корпус пуст: {directory}')
+        return
+
+    results = {}
+    for name, extractor_class in EXTRACTORS.items():
+        extractor = extractor_class()
+        start_time = time.perf_counter()
+        results[name] = [extractor.extract(html) for html in pages]
+        elapsed = time.perf_counter() - start_time
+        chars = sum(len(text) for text in results[name]) / len(pages)
+        print(f'{name}: {elapsed / len(pages) * 1000:.1f} мс/страница, в среднем {chars:.0f} символов')
+
+    baseline = results['soup']
+    for name, texts in results.items():
+        if name == 'soup':
+            continue
+        similarities = []
+        for text, base in zip(texts, baseline):
+            words, base_words = set(text.lower().split()), set(base.lower().split())
+            if words or base_words:
+                similarities.append(len(words & base_words) / len(words | base_words))
+        mean = sum(similarities) / len(similarities) if similarities else 0
+        print(f'{name}: сходство слов с soup {mean:.1%}')
+
+
+# Сравнение экстракторов: python -m tools.html_extract [--corpus DIR]
+# (корпус собирается при settings.HTML_EXTRACTION['save_corpus'] > 0)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Сравнение экстракторов текста HTML')
+    parser.add_argument('--corpus', default=corpus_dir(), help='Каталог с сохраненными страницами *.html')
+    args = parser.parse_args()
+    benchmark(args.corpus)
@@ -0,0 +1,132 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from tools.normalize_data import clean_text
+
+# Простое число Мерсенна 2^31 - 1: произведения a * x помещаются в uint64 без переполнения
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class MinHashLSH:
+    """
+    Поиск почти одинаковых текстов: MinHash-подписи по словесным шинглам и LSH по полосам подписи.
+
+    Тексты, у которых совпала хотя бы одна полоса подписи, становятся кандидатами, кандидаты
+    с оценкой сходства Жаккара не ниже threshold объединяются в одну группу.
+    """
+
+    def __init__(self, threshold: float, num_perm: int, bands: int, shingle_size: int, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm должно делиться на bands')
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        random_state = np.random.RandomState(seed)
+        self._a = random_state.randint(1, int(MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+        self._b = random_state.randint(0, int(MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash-подпись текста или None, если в тексте нет ни одного слова (такие тексты не группируются)"""
+        words = WORD_PATTERN.findall(clean_text(text).lower())
+        if not words:
+            return None
+        size = self.shingle_size
+        shingles = {' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles)) % MERSENNE_PRIME
+        return ((np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME).min(axis=0)
+
+    def group(self, texts: list[str]) -> list[int]:
+        """Номер группы для каждого текста (номер — индекс первого текста группы)"""
+        signatures = [self.signature(text) for text in texts]
+        parents = list(range(len(texts)))
+
+        def find(index: int) -> int:
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            start, end = band * self.rows, (band + 1) * self.rows
+            for index, signature in enumerate(signatures):
+                if signature is None:
+                    continue
+                buckets[signature[start:end].tobytes()].append(index)
+
+            for members in buckets.values():
+                # Сравниваем с первым текстом корзины: транзитивность достраивает группу
+                first = members[0]
+                for index in members[1:]:
+                    if find(index) == find(first):
+                        continue
+                    if np.mean(signatures[first] == signatures[index]) >= self.threshold:
+                        parents[max(find(index), find(first))] = min(find(index), find(first))
+
+        return [find(index) for index in range(len(texts))]
+
+
+def mark_near_duplicates(df: pd.DataFrame, column: str = 'raw_data') -> pd.DataFrame:
+    """
+    Размечает группы почти одинаковых текстов (перепосты, перепечатки лент агентств), строки не удаляются.
+
+    Представитель группы — текст одобренного источника, среди них самый длинный. В колонку duplicate_group
+    записывается номер группы (номер строки представителя), в колонку duplicates — размер группы
+    у представителя и 0 у повторов. Тексты без слов не группируются. Порядок строк сохраняется
+    """
+    options = settings.NEAR_DUPLICATES
+    if not options['enabled'] or len(df) == 0:
+        return df
+
+    df = df.reset_index(drop=True)
+    texts = df[column]
+    has_text = texts.map(lambda text: isinstance(text, str) and bool(text.strip()))
+    indexes = df.index[has_text]
+
+    lsh = MinHashLSH(options['threshold'], options['num_perm'], options['bands'], options['shingle_size'])
+    groups = pd.Series(indexes[lsh.group(texts[indexes].tolist())], index=indexes)
+
+    approved = df['approved'].fillna(False).astype(bool) if 'approved' in df.columns else pd.Series(False, df.index)
+    ranking = pd.DataFrame({
+        'group': groups,
+        'approved': approved[indexes],
+        'length': texts[indexes].str.len()
+    }).sort_values(['group', 'approved', 'length'], ascending=[True, False, False])
+    representatives = ranking.drop_duplicates('group')
+    # Номер группы — строка представителя
+    group_ids = pd.Series(representatives.index, index=representatives['group'])
+
+    df['duplicate_group'] = df.index
+    df.loc[indexes, 'duplicate_group'] = group_ids[groups].to_numpy()
+    df['duplicates'] = 1
+    df.loc[indexes, 'duplicates'] = 0
+    df.loc[representatives.index, 'duplicates'] = ranking.groupby('group').size()[representatives['group']].to_numpy()
+
+    repeated = int((df['duplicates'] == 0).sum())
+    if repeated:
+        print(f'Почти одинаковые тексты: повторов {repeated} из {len(df)}, групп с повторами '
+              f'{int((df["duplicates"] > 1).sum())}')
+    return df
+
+
+def drop_near_duplicates(df: pd.DataFrame, column: str = 'raw_data') -> pd.DataFrame:
+    """
+    Оставляет по одному тексту из каждой группы почти одинаковых (перед генерацией тем).
+
+    Сырые данные, размеченные при обходе, не пересчитываются: удаляются строки с duplicates == 0
+    """
+    if 'duplicates' not in df.columns:
+        df = mark_near_duplicates(df, column)
+        if 'duplicates' not in df.columns:
+            return df
+    return df[df['duplicates'] != 0].reset_index(drop=True)
@@ -1,8 +1,11 @@
 import re
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 import pandas as pd
 
 from config.settings import settings
+from tools.region_matcher import get_region_matcher
 
 
 def clean_text(text):
@@ -29,14 +32,89 @@ def identification_region(region: str, df: pd.DataFrame) -> str:
         # Создаем копию DataFrame для безопасности
         df = df.copy()
 
-        # Приводим текст и ключевые слова к нижнему регистру
-        content_lower = df['raw_data'].str.lower()
-        pattern = '|'.join([kw.lower() for kw in settings.REGION_KEYWORDS[region]])
-
-        # Находим строки, где content содержит ключевые слова региона
-        mask = content_lower.str.contains(pattern, na=False, regex=True)
+        # Один автомат по всем регионам: каждый текст сканируется один раз, результат кэшируется,
+        # поэтому проверка того же сообщения для других регионов сводится к поиску в кэше
+        matcher = get_region_matcher()
+        mask = df['raw_data'].map(lambda text: region in matcher.match(text)).astype(bool)
 
         # Заполняем region только для найденных строк с Undefined
         df.loc[mask & (df['region'] == 'Undefined'), 'region'] = region
 
-        return df
\ No newline at end of file
+        return df
+
+
+def build_region_index(df: pd.DataFrame) -> dict[str, pd.Index]:
+        """
+        Классифицирует все строки DataFrame сразу по всем регионам.
+
+        Возвращает словарь регион -> индексы строк, в тексте которых встречаются ключевые слова региона.
+        Отбор строк одного региона после этого сводится к поиску по словарю.
+        """
+        matcher = get_region_matcher()
+        rows_by_region = defaultdict(list)
+        for row_index, regions in zip(df.index, df['raw_data'].map(matcher.match)):
+            for region in regions:
+                rows_by_region[region].append(row_index)
+
+        return {region: pd.Index(rows) for region, rows in rows_by_region.items()}
+
+
+def select_region_rows(region: str, df: pd.DataFrame, region_index: dict[str, pd.Index]) -> pd.DataFrame:
+        """Строки региона по готовому индексу (аналог identification_region с фильтром по региону)"""
+        rows = region_index.get(region)
+        if rows is None or not len(rows):
+            return df.iloc[0:0].copy()
+
+        new_data = df.loc[rows]
+        # Как и в identification_region, регион проставляется только строкам с Undefined
+        new_data = new_data.loc[new_data['region'].isin(['Undefined', region])].copy()
+        new_data['region'] = region
+        return new_data
+
+# Параметры запроса, которые не влияют на содержимое страницы: идентификаторы кликов и рассылок
+# (параметры utm_* отбрасываются по префиксу)
+TRACKING_QUERY_PARAMS = {'fbclid', 'gclid', 'yclid', 'ysclid', 'dclid', 'msclkid', '_openstat', 'mc_cid', 'mc_eid',
+                         'igshid'}
+# Дополнительные трекинговые параметры отдельных сайтов (на других сайтах те же имена могут менять страницу)
+DOMAIN_TRACKING_QUERY_PARAMS = {
+    'twitter.com': {'ref_src', 's'},
+    'x.com': {'ref_src', 's'},
+}
+# Поддомены мобильных и AMP-версий сайтов
+MOBILE_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.', 'pda.')
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Приводит URL к каноническому виду, чтобы разные варианты ссылки на одну статью совпадали:
+    https, хост без www/мобильного/AMP-поддомена, без якоря, трекинговых параметров,
+    AMP-сегментов пути и завершающего слэша, параметры запроса отсортированы
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'http').lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = parts.netloc.lower()
+    if host.endswith(':80') or host.endswith(':443'):
+        host = host.rsplit(':', 1)[0]
+    for prefix in MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+
+    # AMP-версии: /amp/..., .../amp, ...amp.html
+    path = re.sub(r'/amp(?=/|$)', '', parts.path)
+    path = re.sub(r'\.amp(?=\.html?$)', '', path)
+    path = path.rstrip('/') or '/'
+
+    domain_params = DOMAIN_TRACKING_QUERY_PARAMS.get(host, ())
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key not in TRACKING_QUERY_PARAMS and key not in domain_params
+    ))
+
+    return urlunsplit((scheme, host, path, query, ''))
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config.settings import settings
+from tools.normalize_data import canonicalize_url
+
+
+class PageCache:
+    """
+    Дисковый кэш очищенного текста страниц (SQLite).
+
+    Ключ — хэш канонического URL, поэтому одна и та же статья, найденная через Google и Tavily
+    для разных регионов и категорий, рендерится только один раз.
+    """
+
+    def __init__(self, path: str, ttl_days: float = 30, max_size_mb: float = 1024):
+        self.path = path
+        self.ttl = ttl_days * 24 * 60 * 60
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+
+        # Статистика
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Кэш общий для процессов-исполнителей, поэтому ждем блокировку записи дольше обычного
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(url: str) -> str:
+        """Ключ кэша: sha256 от канонического URL"""
+        return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
+
+    def get(self, url: str) -> Optional[str]:
+        """Возвращает текст страницы из кэша или None, если его нет или он устарел"""
+        key = self.make_key(url)
+        now = time.time()
+
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT content, created_at FROM pages WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            content, created_at = row
+            if now - created_at > self.ttl:
+                self.connection.execute('DELETE FROM pages WHERE key = ?', (key,))
+                self.connection.commit()
+                self.misses += 1
+                return None
+
+            self.connection.execute('UPDATE pages SET accessed_at = ? WHERE key = ?', (now, key))
+            self.connection.commit()
+            self.hits += 1
+            return content
+
+    def set(self, url: str, content: Optional[str]):
+        """Сохраняет текст страницы. Пустые результаты не кэшируются, чтобы их можно было перепарсить"""
+        if not content:
+            return
+
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pages (key, url, content, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self.make_key(url), url, content, len(content.encode('utf-8')), now, now)
+            )
+            self.connection.commit()
+
+            # Размер базы проверяем не на каждую запись
+            self._writes_since_check += 1
+            if self._writes_since_check >= 100:
+                self._writes_since_check = 0
+                self._evict()
+
+    def _evict(self):
+        """Удаляет устаревшие записи, затем давно не использованные, пока кэш не уложится в лимит"""
+        cursor = self.connection.execute('DELETE FROM pages WHERE created_at < ?', (time.time() - self.ttl,))
+        self.evicted += cursor.rowcount
+
+        total_size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total_size > self.max_size_bytes:
+            # Освобождаем с запасом, чтобы не вытеснять записи на каждой проверке
+            to_free = total_size - self.max_size_bytes * 0.9
+            freed = 0
+            keys = []
+            for key, size in self.connection.execute('SELECT key, size FROM pages ORDER BY accessed_at'):
+                keys.append((key,))
+                freed += size
+                if freed >= to_free:
+                    break
+            self.connection.executemany('DELETE FROM pages WHERE key = ?', keys)
+            self.evicted += len(keys)
+
+        self.connection.commit()
+
+    def clear(self):
+        """Полная очистка кэша"""
+        with self._lock:
+            self.connection.execute('DELETE FROM pages')
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self.connection.close()
+
+    def print_statistics(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0
+        print(f'Кэш страниц: попаданий {self.hits}, промахов {self.misses} ({hit_rate:.1%} попаданий), '
+              f'вытеснено {self.evicted}')
+
+
+_page_cache = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Общий кэш страниц процесса (None, если кэш выключен в настройках)"""
+    global _page_cache
+    if not settings.PAGE_CACHE['enabled']:
+        return None
+    if _page_cache is None:
+        _page_cache = PageCache(
+            path=os.path.join(settings.OUTPUT_DIR_CACHE, 'pages.sqlite'),
+            ttl_days=settings.PAGE_CACHE['ttl_days'],
+            max_size_mb=settings.PAGE_CACHE['max_size_mb']
+        )
+    return _page_cache
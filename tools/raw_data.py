@@ -1,4 +1,5 @@
 import asyncio
+import os
 from datetime import datetime, timezone, date
 from pathlib import Path
 
@@ -10,48 +11,12 @@ from parsers.google_parser import GoogleParser
 from parsers.tavily_parser import TavilyParser
 from parsers.telegram_parser import TelegramParser
 from parsers.website_parser_playwright import WebsiteParser
-from tools.normalize_data import identification_region
-
-
-def fill_raw_data_html(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Заполняет недостающие raw_data HTML-контентом страниц, используя UniversalParser
-
-    Параметры:
-        df: DataFrame с колонками ['url', 'raw_data', ...]
-
-    Возвращает:
-        Обновленный DataFrame с заполненными raw_data
-    """
-    # Удаляем дубликаты
-    df = df.drop_duplicates()
-
-    # Создаем экземпляр парсера один раз для всех запросов
-    parser = WebsiteParser()
-
-    def parse_url(url: str) -> str:
-        """Вспомогательная функция для парсинга URL"""
-        try:
-            content = parser.parse(url)
-            return content if content else ""
-        except Exception as e:
-            print(f"Ошибка при парсинге {url}: {str(e)}")
-            return ""
-
-    # Находим строки, где нужно собрать данные
-    mask = (df['raw_data'].isna()) | (df['raw_data'] == '')
-
-    # Применяем парсер только к этим строкам
-    if mask.any():
-        # Используем progress_apply для отображения прогресса (если установлен tqdm)
-        try:
-            from tqdm import tqdm
-            tqdm.pandas(desc="Парсинг URL")
-            df.loc[mask, 'raw_data'] = df.loc[mask, 'url'].progress_apply(parse_url)
-        except ImportError:
-            df.loc[mask, 'raw_data'] = df.loc[mask, 'url'].apply(parse_url)
-
-    return df
+from tools.normalize_data import identification_region, build_region_index, select_region_rows
+from tools.host_scheduler import HostScheduler, interleave_by_host
+from tools.page_cache import get_page_cache
+from tools.result_sink import ResultSink
+from tools.storage import load_frame, save_frame, export_excel
+from tools.url_registry import UrlRegistry
 
 
 # def get_raw_data(sources: list[str],
@@ -241,6 +206,134 @@ def fill_raw_data_html(df: pd.DataFrame) -> pd.DataFrame:
 #             month_begin, month_begin_utc, max_concurrent
 #         )
 #     )
+RAW_DATA_COLUMNS = ['url', 'region', 'category', 'period', 'date_from', 'approved', 'raw_data']
+
+
+def empty_raw_data() -> pd.DataFrame:
+    """Пустой DataFrame сырых данных с базовыми типами колонок"""
+    fields = {
+        'region': pd.Series(dtype='str'),
+        'category': pd.Series(dtype='str'),
+        'period': pd.Series(dtype='str'),
+        'month_begin': pd.Series(dtype='datetime64[ns]'),
+        'approved': pd.Series(dtype='bool')
+    }
+    return pd.DataFrame(fields)
+
+
+def load_telegram_base(
+        category: str,
+        region: str,
+        period: str,
+        to_excel: bool,
+        month_begin_utc: datetime = datetime.now(timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+) -> pd.DataFrame:
+    """
+    Загружает базу сообщений Telegram по категории.
+
+    В инкрементальном режиме база всегда строится из хранилища каналов (с докачкой новых сообщений),
+    иначе используется уже собранный файл базы, если он есть. При settings.TELEGRAM_PREPARED_ONLY
+    отсутствие файла — ошибка: к Telegram процесс не подключается
+    """
+    if not settings.TELEGRAM_INCREMENTAL or settings.TELEGRAM_PREPARED_ONLY:
+        name = f"Telegram_{category}_BASE_{period}_{month_begin_utc}"
+        telegram_data = load_frame(settings.OUTPUT_DIR_PROCESSED, name)
+        if telegram_data is not None:
+            print(f'База Telegram по категории {category} найдена!')
+            return telegram_data
+        if settings.TELEGRAM_PREPARED_ONLY:
+            raise FileNotFoundError(f'Нет готовой базы Telegram {name} в {settings.OUTPUT_DIR_PROCESSED}: '
+                                    f'базы собирает запускающий процесс обхода')
+
+    # Для Telegram используем синхронную версию парсера
+    return TelegramParser(
+        category, region, period, month_begin_utc, to_excel
+    ).raw_data
+
+
+# Загруженные базы Telegram с индексом регионов: (категория, период, дата начала) -> (база, индекс)
+_telegram_bases: dict[tuple, tuple[pd.DataFrame, dict]] = {}
+
+
+def get_telegram_base(
+        category: str,
+        region: str,
+        period: str,
+        to_excel: bool,
+        month_begin_utc: datetime = datetime.now(timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+) -> tuple[pd.DataFrame, dict]:
+    """База Telegram по категории вместе с индексом регионов. Загружается и классифицируется один раз на процесс"""
+    key = (category, period, month_begin_utc)
+    if key not in _telegram_bases:
+        telegram_data = load_telegram_base(category, region, period, to_excel, month_begin_utc)
+        _telegram_bases[key] = (telegram_data, build_region_index(telegram_data))
+    return _telegram_bases[key]
+
+
+def select_region(region: str, telegram_data: pd.DataFrame, region_index: dict = None) -> pd.DataFrame:
+    """Оставляет в базе Telegram только сообщения, относящиеся к региону"""
+    if region_index is None:
+        new_data = identification_region(region, telegram_data)
+        new_data = new_data.loc[new_data['region'] == region]
+    else:
+        new_data = select_region_rows(region, telegram_data, region_index)
+    print(f'Размер данных: {len(new_data)}')
+    return new_data
+
+
+def collect_source_data(
+        source: str,
+        category: str,
+        region: str,
+        period: str,
+        to_excel: bool,
+        month_begin: datetime = date.today().replace(day=1),
+        month_begin_utc: datetime = datetime.now(timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+) -> pd.DataFrame:
+    """Сбор сырых данных из одного источника для пары регион/категория"""
+    match source:
+        case 'Google':
+            new_data = GoogleParser(
+                category, region, period, month_begin, to_excel
+            ).raw_data
+        case 'Tavily':
+            new_data = TavilyParser(
+                category, region, period, month_begin, to_excel
+            ).raw_data
+        case 'Telegram':
+            telegram_data, region_index = get_telegram_base(category, region, period, to_excel, month_begin_utc)
+            new_data = select_region(region, telegram_data, region_index)
+        case _:
+            raise ValueError(f'Неизвестный источник: {source}')
+
+    return new_data[[col for col in RAW_DATA_COLUMNS if col in new_data.columns]]
+
+
+def merge_source_data(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Объединяет данные из разных источников в один DataFrame без дубликатов"""
+    full_data = empty_raw_data()
+    for new_data in frames:
+        full_data = pd.concat([full_data, new_data], ignore_index=True)
+
+    full_data.drop_duplicates(keep='last', inplace=True)
+    return full_data
+
+
+def save_raw_data(region: str, category: str, raw_data: pd.DataFrame, period: str, month_begin: datetime) -> list[str]:
+    """
+    Сохраняет сырые данные пары и возвращает пути к файлам (для журнала обхода).
+
+    Parquet — промежуточный формат для следующих шагов, Excel — только финальная выгрузка для архива
+    """
+    frame_file = save_frame(raw_data, settings.OUTPUT_DIR_RAW, f'RAW_{category}_{region}_{period}_{month_begin}')
+    excel_file = os.path.join(settings.OUTPUT_DIR_RAW, f'RAW_{category}_{region}_{period}_{month_begin}.xlsx')
+    export_excel(raw_data.drop(columns=['url']), excel_file)
+    return [frame_file, excel_file]
+
+
 def collect_raw_data_sync(
         sources: list[str],
         category: str,
@@ -254,90 +347,102 @@ def collect_raw_data_sync(
     """Синхронный сбор сырых данных из различных источников"""
     print(f'**** СБОР СЫРЫХ ДАННЫХ ****')
 
-    fields = {
-        'region': pd.Series(dtype='str'),
-        'category': pd.Series(dtype='str'),
-        'period': pd.Series(dtype='str'),
-        'month_begin': pd.Series(dtype='datetime64[ns]'),
-        'approved': pd.Series(dtype='bool')
-    }
-    full_data = pd.DataFrame(fields)
-
+    frames = []
     for source in sources:
         print(f"\nОбработка источника: {source}")
+        frames.append(collect_source_data(
+            source, category, region, period, to_excel, month_begin, month_begin_utc
+        ))
 
-        match source:
-            case 'Google':
-                new_data = GoogleParser(
-                    category, region, period, month_begin, to_excel
-                ).raw_data
-            case 'Tavily':
-                new_data = TavilyParser(
-                    category, region, period, month_begin, to_excel
-                ).raw_data
-            case 'Telegram':
-                dir = Path(settings.OUTPUT_DIR_PROCESSED)
-                matching_files = [
-                    f for f in dir.iterdir()
-                    if f.is_file() and f"Telegram_{category}_BASE_{period}_{month_begin_utc}.xlsx" in f.name
-                ]
-
-                if matching_files:
-                    print(f'Файл {matching_files[0]} найден!')
-                    new_data = pd.read_excel(matching_files[0])
-                else:
-                    # Для Telegram используем синхронную версию парсера
-                    new_data = TelegramParser(
-                        category, region, period, month_begin_utc, to_excel
-                    ).raw_data
-
-                new_data = identification_region(region, new_data)
-                new_data = new_data.loc[new_data['region'] == region]
-                print(f'Размер данных: {len(new_data)}')
-
-        required_cols = ['url', 'region', 'category', 'period', 'date_from', 'approved', 'raw_data']
-        new_data = new_data[[col for col in required_cols if col in new_data.columns]]
-        full_data = pd.concat([full_data, new_data], ignore_index=True)
-
-    full_data.drop_duplicates(keep='last', inplace=True)
-    return full_data
+    return merge_source_data(frames)
 
 
 async def parse_websites_only_async(
         full_data: pd.DataFrame,
-        max_concurrent: int = 3
+        max_concurrent: int = 3,
+        parser: WebsiteParser = None,
+        registry: UrlRegistry = None,
+        pair: tuple = None,
+        host_scheduler: HostScheduler = None,
+        sink: ResultSink = None
 ) -> pd.DataFrame:
-    """Только асинхронный парсинг сайтов"""
+    """
+    Только асинхронный парсинг сайтов
+
+    Параметры:
+        full_data: DataFrame с колонками ['url', 'raw_data', ...]
+        max_concurrent: максимальное количество одновременных запросов (если не передан host_scheduler)
+        parser: общий парсер (например, BrowserPool на весь обход). Если не передан,
+                для вызова запускается отдельный браузер
+        registry: общий реестр URL обхода, чтобы один URL не скачивался для разных пар
+        pair: пара (регион, категория), к которой относится full_data
+        host_scheduler: общий планировщик хостов обхода (лимиты на каждый сайт)
+        sink: хранилище текстов страниц на диске. Страницы, уже сохраненные в нем
+              (например, до падения предыдущего запуска), повторно не загружаются
+    """
     print(f'\n**** ПАРСИНГ ДАННЫХ С САЙТОВ ****')
 
     mask = (full_data['raw_data'].isna()) | (full_data['raw_data'] == '')
-    urls_to_parse = full_data.loc[mask, 'url'].tolist()
+    urls_to_parse = full_data.loc[mask, 'url'].dropna().unique().tolist()
 
     if not urls_to_parse:
         print("Нет URL для парсинга - все данные уже заполнены")
         return full_data
 
+    own_sink = sink is None
+    if own_sink:
+        sink = ResultSink()
+
+    completed = sink.completed(urls_to_parse)
+    if completed:
+        print(f"Уже сохранено {len(completed)} страниц")
+        urls_to_parse = [url for url in urls_to_parse if url not in completed]
+
     print(f"Найдено {len(urls_to_parse)} URL для парсинга")
 
-    async with WebsiteParser(
-            headless=True,
-            timeout=15000
-    ) as parser:
-        semaphore = asyncio.Semaphore(max_concurrent)
+    if registry is None:
+        registry = UrlRegistry()
+    if host_scheduler is None:
+        host_scheduler = HostScheduler(max_total=max_concurrent)
+
+    if urls_to_parse and parser is None:
+        async with WebsiteParser(
+                headless=True,
+                timeout=15000
+        ) as parser:
+            await _parse_urls(parser, urls_to_parse, host_scheduler, registry, sink, pair)
+    elif urls_to_parse:
+        await _parse_urls(parser, urls_to_parse, host_scheduler, registry, sink, pair)
+
+    # Результат раздается всем строкам с этим URL
+    full_data = sink.join(full_data, mask)
+    if own_sink:
+        sink.close()
+    return full_data
 
-        async def parse_single_url(url):
-            async with semaphore:
-                return await parser.parse(url)
 
-        tasks = [parse_single_url(url) for url in urls_to_parse]
+async def _parse_urls(parser: WebsiteParser, urls_to_parse: list[str], host_scheduler: HostScheduler,
+                      registry: UrlRegistry, sink: ResultSink, pair: tuple = None):
+    cache = get_page_cache()
 
-        parsed_contents = []
-        for future in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Парсинг URL"):
-            result = await future
-            parsed_contents.append(result)
+    async def fetch(url):
+        if cache:
+            cached = cache.get(url)
+            if cached is not None:
+                return cached
+        content = await host_scheduler.run(url, lambda timing: parser.parse(url, timing))
+        if cache:
+            cache.set(url, content)
+        return content
 
-    full_data.loc[mask, 'raw_data'] = parsed_contents
-    return full_data
+    async def parse_single_url(url):
+        # Текст сразу уходит в хранилище и в памяти не накапливается
+        sink.put(url, await registry.resolve(url, fetch, pair))
+
+    tasks = [parse_single_url(url) for url in interleave_by_host(urls_to_parse)]
+
+    for future in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Парсинг URL"):
+        await future
 
 
 def get_raw_data(
@@ -0,0 +1,82 @@
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+from config.settings import settings
+
+
+class RegionMatcher:
+    """
+    Автомат Ахо–Корасик по ключевым словам всех регионов.
+
+    Находит все регионы, упомянутые в тексте, за один проход по тексту (включая пересекающиеся
+    ключевые слова, например "москв" и "московская область"). Результат кэшируется для каждого текста,
+    поэтому повторная проверка того же сообщения для другого региона не сканирует текст заново.
+    """
+
+    def __init__(self, region_keywords: dict[str, list[str]], cache_size: int = 200_000):
+        # Бор: переходы, ссылки на суффиксы и регионы, ключевые слова которых заканчиваются в узле
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[frozenset] = [frozenset()]
+
+        outputs: list[set] = [set()]
+        for region, keywords in region_keywords.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                node = 0
+                for char in keyword:
+                    next_node = self._goto[node].get(char)
+                    if next_node is None:
+                        next_node = len(self._goto)
+                        self._goto[node][char] = next_node
+                        self._goto.append({})
+                        self._fail.append(0)
+                        outputs.append(set())
+                    node = next_node
+                outputs[node].add(region)
+
+        # Ссылки на суффиксы строим обходом в ширину, выходы узла дополняем выходами суффикса
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(char, 0)
+                outputs[next_node] |= outputs[self._fail[next_node]]
+
+        self._output = [frozenset(regions) for regions in outputs]
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, text: Optional[str]) -> frozenset:
+        """Все регионы, ключевые слова которых встречаются в тексте"""
+        if not isinstance(text, str) or not text:
+            return frozenset()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        node = 0
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+
+        return frozenset(found)
+
+
+_region_matcher = None
+
+
+def get_region_matcher() -> RegionMatcher:
+    """Общий автомат по settings.REGION_KEYWORDS"""
+    global _region_matcher
+    if _region_matcher is None:
+        _region_matcher = RegionMatcher(settings.REGION_KEYWORDS)
+    return _region_matcher
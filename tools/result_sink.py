@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# Сколько URL читать из хранилища за один запрос при сборке результата
+FETCH_CHUNK_SIZE = 500
+
+
+class ResultSink:
+    """
+    Потоковая запись текстов страниц по URL (SQLite).
+
+    Каждая страница записывается, как только загружена, поэтому тексты не копятся в памяти до конца
+    пакета, а после падения уже скачанные страницы остаются на диске и при повторном запуске не
+    загружаются снова. В конце тексты подставляются в DataFrame по URL частями.
+
+    Каждая запись фиксируется сразу: в режиме WAL с synchronous=NORMAL фиксация — дописывание в журнал
+    без fsync, поэтому она дешевая, а при падении процесса теряется не больше текущей страницы.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content TEXT
+            )
+        ''')
+        self.connection.commit()
+
+    def put(self, url: str, content: Optional[str]):
+        """Записывает результат страницы (None — неудачная загрузка, при повторном запуске повторится)"""
+        with self._lock:
+            self.connection.execute('INSERT OR REPLACE INTO pages (url, content) VALUES (?, ?)', (url, content))
+            self.connection.commit()
+
+    def _chunks(self, urls: list[str]) -> Iterable[list[str]]:
+        for start in range(0, len(urls), FETCH_CHUNK_SIZE):
+            yield urls[start:start + FETCH_CHUNK_SIZE]
+
+    def completed(self, urls: list[str]) -> set[str]:
+        """URL из списка, текст которых уже сохранен"""
+        done = set()
+        with self._lock:
+            for chunk in self._chunks(urls):
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f'SELECT url FROM pages WHERE content IS NOT NULL AND url IN ({placeholders})', chunk
+                ).fetchall()
+                done.update(row[0] for row in rows)
+        return done
+
+    def join(self, df: pd.DataFrame, mask: pd.Series, column: str = 'raw_data') -> pd.DataFrame:
+        """Подставляет сохраненные тексты в строки df[mask] по URL"""
+        urls = df.loc[mask, 'url'].dropna().unique().tolist()
+        for chunk in self._chunks(urls):
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                contents = dict(self.connection.execute(
+                    f'SELECT url, content FROM pages WHERE url IN ({placeholders})', chunk
+                ).fetchall())
+            rows = mask & df['url'].isin(contents.keys())
+            df.loc[rows, column] = df.loc[rows, 'url'].map(contents)
+        return df
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def remove(self):
+        """Закрывает и удаляет хранилище (после того как результат сохранен в итоговый файл)"""
+        self.close()
+        if self.path != ':memory:':
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
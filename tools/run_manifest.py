@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from config.settings import settings
+
+# Статусы единицы работы
+RUNNING = 'running'  # Запущена (если так и осталась — обход упал на ней)
+DONE = 'done'  # Выполнена полностью
+PARTIAL = 'partial'  # Результат сохранен, но часть источников завершилась ошибкой
+FAILED = 'failed'  # Завершилась ошибкой
+
+
+class RunManifest:
+    """
+    Журнал обхода: состояние каждой единицы работы (регион, категория, этап) и пути к ее результатам (SQLite).
+
+    Единица записывается при старте, после успешного сохранения результата и при ошибке, поэтому после
+    падения обхода видно, что уже сделано. В режиме продолжения готовые единицы пропускаются (если их
+    файлы на месте), а упавшие, частичные и незавершенные выполняются заново.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Журнал общий для процессов-исполнителей, поэтому ждем блокировку записи дольше обычного
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS units (
+                region TEXT NOT NULL,
+                category TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL,
+                outputs TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (region, category, stage)
+            )
+        ''')
+        self.connection.commit()
+
+    def _write(self, region: str, category: str, stage: str, status: str, outputs: list[str] = None,
+               error: str = None, new_attempt: bool = False):
+        with self._lock:
+            self.connection.execute(
+                'INSERT INTO units (region, category, stage, status, outputs, error, attempts, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (region, category, stage) DO UPDATE SET '
+                'status = excluded.status, outputs = excluded.outputs, error = excluded.error, '
+                'attempts = units.attempts + ?, updated_at = excluded.updated_at',
+                (region, category, stage, status, json.dumps(outputs or [], ensure_ascii=False), error,
+                 int(new_attempt), time.time(), int(new_attempt))
+            )
+            self.connection.commit()
+
+    def start(self, region: str, category: str, stage: str):
+        self._write(region, category, stage, RUNNING, new_attempt=True)
+
+    def done(self, region: str, category: str, stage: str, outputs: Iterable[str] = None, partial: bool = False):
+        self._write(region, category, stage, PARTIAL if partial else DONE, outputs=list(outputs or []))
+
+    def fail(self, region: str, category: str, stage: str, error: str):
+        self._write(region, category, stage, FAILED, error=error)
+
+    def status(self, region: str, category: str, stage: str) -> Optional[str]:
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT status FROM units WHERE region = ? AND category = ? AND stage = ?', (region, category, stage)
+            ).fetchone()
+        return row[0] if row else None
+
+    def outputs(self, region: str, category: str, stage: str) -> list[str]:
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT outputs FROM units WHERE region = ? AND category = ? AND stage = ?', (region, category, stage)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def is_done(self, region: str, category: str, stage: str) -> bool:
+        """Единица выполнена полностью и все ее файлы на месте"""
+        if self.status(region, category, stage) != DONE:
+            return False
+        return all(os.path.exists(path) for path in self.outputs(region, category, stage))
+
+    def run(self, region: str, category: str, stage: str, func: Callable[[], Iterable[str]],
+            resume: bool = True) -> bool:
+        """
+        Выполняет этап для пары, если он еще не выполнен, и записывает результат в журнал.
+
+        func возвращает пути к сохраненным файлам. Возвращает False, если этап пропущен как готовый.
+        """
+        if resume and self.is_done(region, category, stage):
+            return False
+        self.start(region, category, stage)
+        try:
+            outputs = func()
+        except Exception as e:
+            self.fail(region, category, stage, str(e))
+            raise
+        self.done(region, category, stage, outputs)
+        return True
+
+    def counts(self, stage: str = None) -> dict[str, int]:
+        with self._lock:
+            if stage is None:
+                rows = self.connection.execute('SELECT status, COUNT(*) FROM units GROUP BY status').fetchall()
+            else:
+                rows = self.connection.execute(
+                    'SELECT status, COUNT(*) FROM units WHERE stage = ? GROUP BY status', (stage,)
+                ).fetchall()
+        return dict(rows)
+
+    def unfinished(self, stage: str = None) -> list[tuple]:
+        """Единицы, которые при продолжении будут выполнены заново: (регион, категория, этап, статус, ошибка)"""
+        query = 'SELECT region, category, stage, status, error FROM units WHERE status != ?'
+        params = [DONE]
+        if stage is not None:
+            query += ' AND stage = ?'
+            params.append(stage)
+        with self._lock:
+            return self.connection.execute(query + ' ORDER BY updated_at', params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def print_statistics(self, stage: str = None):
+        counts = self.counts(stage)
+        print(f'Журнал обхода {os.path.basename(self.path)}: готово {counts.get(DONE, 0)}, '
+              f'частично {counts.get(PARTIAL, 0)}, ошибок {counts.get(FAILED, 0)}, '
+              f'не завершено {counts.get(RUNNING, 0)}')
+        for region, category, unit_stage, status, error in self.unfinished(stage)[:10]:
+            print(f'    {region} / {category} / {unit_stage}: {status}' + (f' ({error})' if error else ''))
+
+
+def manifest_path(period: str, month_begin) -> str:
+    """Журнал одного обхода (период и месяц)"""
+    return os.path.join(settings.OUTPUT_DIR_CACHE, 'runs', f'RUN_{period}_{month_begin}.sqlite')
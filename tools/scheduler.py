@@ -0,0 +1,302 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, date
+from functools import partial
+from typing import Callable, Awaitable, Optional
+
+import pandas as pd
+
+from config.settings import settings
+from parsers.website_parser_http import HttpFirstParser
+from parsers.website_parser_playwright import BrowserPool
+from tools.host_scheduler import HostScheduler
+from tools.page_cache import get_page_cache
+from tools.result_sink import ResultSink
+from tools.run_manifest import RunManifest, manifest_path, DONE, PARTIAL, FAILED
+from tools.url_registry import UrlRegistry
+from tools.raw_data import (collect_source_data, get_telegram_base, select_region, merge_source_data,
+                            parse_websites_only_async)
+from tools.near_duplicates import mark_near_duplicates
+
+
+@dataclass
+class SweepJob:
+    key: str  # Уникальный ключ задачи
+    kind: str  # Тип задачи (Google, Tavily, TelegramBase, Telegram, Websites)
+    category: str  # Категория
+    region: Optional[str]  # Регион (None для задач уровня категории)
+    action: Callable[[], Awaitable]  # Корутина, выполняющая задачу
+    deps: list[str] = field(default_factory=list)  # Ключи задач, которые должны завершиться раньше
+    result: object = None  # Результат выполнения
+    failed: bool = False  # Завершилась ли задача ошибкой
+
+
+@dataclass
+class JobStats:
+    total: int = 0  # Всего задач данного типа
+    done: int = 0  # Успешно выполнено
+    failed: int = 0  # Завершено с ошибкой
+    busy_time: float = 0.0  # Суммарное время выполнения задач (сек.)
+
+
+class SweepScheduler:
+    """
+    Планировщик обхода регион × категория.
+
+    Разворачивает обход в граф задач (источник, регион, категория) и выполняет независимые задачи
+    параллельно с ограничением одновременных задач для каждого типа источника.
+    """
+
+    def __init__(self,
+                 sources: list[str],
+                 regions: list[str],
+                 categories: list[str],
+                 period: str,
+                 to_excel: bool,
+                 month_begin: datetime = date.today().replace(day=1),
+                 month_begin_utc: datetime = datetime.now(timezone.utc).replace(
+                     day=1, hour=0, minute=0, second=0, microsecond=0),
+                 max_concurrent: int = None,
+                 concurrency: dict = None,
+                 on_pair_done: Callable[[str, str, pd.DataFrame], Optional[list[str]]] = None,
+                 resume: bool = None,
+                 pairs: list[tuple[str, str]] = None):
+        self.sources = sources
+        self.regions = regions
+        self.categories = categories
+        # Пары (регион, категория) обхода: все сочетания или явный список (доля обхода в процессе-исполнителе)
+        self.pairs = pairs if pairs is not None else [(region, category) for region in regions for category in categories]
+        self.period = period
+        self.to_excel = to_excel
+        self.month_begin = month_begin
+        self.month_begin_utc = month_begin_utc
+        self.max_concurrent = max_concurrent  # Одновременных загрузок страниц на весь обход (None — из настроек)
+        self.concurrency = {**settings.SWEEP_CONCURRENCY, **(concurrency or {})}
+        self.on_pair_done = on_pair_done  # Сохраняет результат пары и возвращает пути к файлам для журнала
+        # Журнал обхода: готовые пары при повторном запуске пропускаются, упавшие выполняются заново
+        self.manifest = RunManifest(manifest_path(period, month_begin)) if settings.RUN_MANIFEST['enabled'] else None
+        self.resume = settings.RUN_MANIFEST['resume'] if resume is None else resume
+
+        self.jobs: dict[str, SweepJob] = {}
+        self.stats: dict[str, JobStats] = {}
+        self.pairs_total = 0
+        self.pairs_done = 0
+        self.pairs_skipped = 0  # Готовы по журналу прошлого запуска
+        self.start_time = None
+        self.browser_pool = None  # Общий пул браузеров на весь обход
+        self.host_scheduler = None  # Лимиты запросов к каждому сайту на весь обход
+        self.page_parser = None  # Загрузка страниц: HTTP с откатом на пул браузеров или только пул
+        self.url_registry = None  # Общий реестр URL на весь обход
+
+        self._build_jobs()
+
+    @staticmethod
+    def _key(kind: str, category: str, region: Optional[str] = None) -> str:
+        return f'{kind}|{category}|{region or "*"}'
+
+    def _add_job(self, job: SweepJob):
+        self.jobs[job.key] = job
+        self.stats.setdefault(job.kind, JobStats()).total += 1
+
+    def _build_jobs(self):
+        """Разворачивает обход в граф задач (без пар, готовых по журналу)"""
+        pairs = self.pairs
+        if self.manifest and self.resume:
+            pending = [pair for pair in pairs if not self.manifest.is_done(*pair, 'raw')]
+            self.pairs_skipped = len(pairs) - len(pending)
+            if self.pairs_skipped:
+                print(f'Продолжение обхода: пропущено готовых пар {self.pairs_skipped}, осталось {len(pending)}')
+            pairs = pending
+        self.pairs_total = len(pairs)
+
+        # База Telegram собирается один раз на категорию и используется всеми регионами
+        if 'Telegram' in self.sources:
+            for category in self.categories:
+                if not any(pair_category == category for _, pair_category in pairs):
+                    continue
+                self._add_job(SweepJob(
+                    key=self._key('TelegramBase', category),
+                    kind='TelegramBase',
+                    category=category,
+                    region=None,
+                    action=partial(self._telegram_base, category)
+                ))
+
+        for region, category in pairs:
+            source_keys = []
+            for source in self.sources:
+                key = self._key(source, category, region)
+                if source == 'Telegram':
+                    job = SweepJob(key=key, kind=source, category=category, region=region,
+                                   action=partial(self._telegram_region, category, region),
+                                   deps=[self._key('TelegramBase', category)])
+                else:
+                    job = SweepJob(key=key, kind=source, category=category, region=region,
+                                   action=partial(self._collect_source, source, category, region))
+                self._add_job(job)
+                source_keys.append(key)
+
+            self._add_job(SweepJob(
+                key=self._key('Websites', category, region),
+                kind='Websites',
+                category=category,
+                region=region,
+                action=partial(self._websites, category, region, source_keys),
+                deps=source_keys
+            ))
+
+    def progress(self) -> int:
+        """Счетчик прогресса обхода: завершенные задачи и загрузки страниц (растет, пока обход не завис)"""
+        finished_jobs = sum(stats.done + stats.failed for stats in self.stats.values())
+        # Читается из потока продления аренды, поэтому берем копию словаря хостов
+        hosts = list(self.host_scheduler.hosts.values()) if self.host_scheduler else []
+        requests = sum(state.requests for state in hosts)
+        return finished_jobs + requests
+
+    def pair_status(self, region: str, category: str) -> str:
+        """
+        Итог пары в терминах журнала обхода: FAILED — ошибка, PARTIAL — результат сохранен, но часть
+        источников завершилась ошибкой, DONE — выполнена (в том числе пропущена как готовая по журналу)
+        """
+        job = self.jobs.get(self._key('Websites', category, region))
+        if job is None:
+            return DONE
+        if job.failed:
+            return FAILED
+        if any(self.jobs[key].failed for key in job.deps):
+            return PARTIAL
+        return DONE
+
+    async def _telegram_base(self, category: str) -> tuple[pd.DataFrame, dict]:
+        # База загружается и классифицируется по всем регионам один раз на категорию
+        return await asyncio.to_thread(
+            get_telegram_base, category, None, self.period, self.to_excel, self.month_begin_utc
+        )
+
+    async def _telegram_region(self, category: str, region: str) -> pd.DataFrame:
+        base_job = self.jobs[self._key('TelegramBase', category)]
+        if base_job.failed or base_job.result is None:
+            raise RuntimeError(f'База Telegram для категории {category} не собрана')
+        telegram_data, region_index = base_job.result
+        return select_region(region, telegram_data, region_index)
+
+    async def _collect_source(self, source: str, category: str, region: str) -> pd.DataFrame:
+        return await asyncio.to_thread(
+            collect_source_data, source, category, region, self.period, self.to_excel,
+            self.month_begin, self.month_begin_utc
+        )
+
+    async def _websites(self, category: str, region: str, source_keys: list[str]) -> None:
+        frames = []
+        for key in source_keys:
+            job = self.jobs[key]
+            if job.result is not None:
+                frames.append(job.result)
+                job.result = None  # Освобождаем память, данные источника больше не нужны
+
+        # Тексты страниц пары пишутся на диск по мере загрузки и переживают падение обхода
+        sink = ResultSink(os.path.join(
+            settings.OUTPUT_DIR_CACHE, 'pages', f'PAGES_{category}_{region}_{self.period}_{self.month_begin}.sqlite'
+        ))
+        try:
+            full_data = merge_source_data(frames)
+            full_data = await parse_websites_only_async(full_data, parser=self.page_parser, registry=self.url_registry,
+                                                        pair=(region, category), host_scheduler=self.host_scheduler,
+                                                        sink=sink)
+            # Сырые данные сохраняются полностью, повторы только размечаются и отбрасываются перед генерацией тем
+            full_data = await asyncio.to_thread(mark_near_duplicates, full_data)
+
+            outputs = None
+            if self.on_pair_done:
+                outputs = await asyncio.to_thread(self.on_pair_done, region, category, full_data)
+            if self.manifest:
+                # Пара с упавшими источниками сохранена, но при продолжении будет собрана заново
+                partial_sources = any(self.jobs[key].failed for key in source_keys)
+                self.manifest.done(region, category, 'raw', outputs, partial=partial_sources)
+        except BaseException:
+            sink.close()
+            raise
+        # Результат пары сохранен, промежуточные тексты больше не нужны
+        sink.remove()
+
+    async def _run_job(self, job: SweepJob, done_events: dict, semaphores: dict):
+        # Ждем завершения зависимостей (ошибка зависимости не блокирует задачу)
+        for dep in job.deps:
+            await done_events[dep].wait()
+
+        stats = self.stats[job.kind]
+        try:
+            async with semaphores[job.kind]:
+                job_start = time.time()
+                if self.manifest and job.kind == 'Websites':
+                    self.manifest.start(job.region, job.category, 'raw')
+                try:
+                    job.result = await job.action()
+                    stats.done += 1
+                except Exception as e:
+                    job.failed = True
+                    stats.failed += 1
+                    print(f'Ошибка в задаче {job.key}: {e}')
+                    if self.manifest and job.kind == 'Websites':
+                        self.manifest.fail(job.region, job.category, 'raw', str(e))
+                finally:
+                    stats.busy_time += time.time() - job_start
+        finally:
+            done_events[job.key].set()
+
+        if job.kind == 'Websites':
+            self.pairs_done += 1
+            print(f'***************** {job.region} / {job.category} готово '
+                  f'({self.pairs_done}/{self.pairs_total}) *****************')
+            self.print_progress()
+
+    async def _run(self):
+        self.start_time = time.time()
+        done_events = {key: asyncio.Event() for key in self.jobs}
+        semaphores = {kind: asyncio.Semaphore(self.concurrency.get(kind, 1)) for kind in self.stats}
+        self.url_registry = UrlRegistry(release_content=get_page_cache() is not None)
+        self.host_scheduler = HostScheduler(max_total=self.max_concurrent)
+
+        async with BrowserPool(**settings.BROWSER_POOL) as browser_pool:
+            self.browser_pool = browser_pool
+            if settings.HTTP_FETCH['enabled']:
+                async with HttpFirstParser(browser_pool) as page_parser:
+                    self.page_parser = page_parser
+                    await asyncio.gather(*(self._run_job(job, done_events, semaphores) for job in self.jobs.values()))
+            else:
+                self.page_parser = browser_pool
+                await asyncio.gather(*(self._run_job(job, done_events, semaphores) for job in self.jobs.values()))
+        self.browser_pool = None
+        self.page_parser = None
+
+    def run(self):
+        """Запускает обход и выводит итоговую статистику"""
+        asyncio.run(self._run())
+        self.print_statistics()
+
+    def print_progress(self):
+        """Выводит прогресс и пропускную способность по типам задач"""
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        for kind, stats in self.stats.items():
+            finished = stats.done + stats.failed
+            avg_time = stats.busy_time / finished if finished else 0
+            print(f'    {kind}: {finished}/{stats.total} (ошибок: {stats.failed}), '
+                  f'{finished / elapsed * 60:.2f} задач/мин, среднее время задачи {avg_time:.1f} сек.')
+
+    def print_statistics(self):
+        elapsed = time.time() - self.start_time
+        print(f'Обход завершен за {round(elapsed / 60, 2)} мин. Пар регион/категория: {self.pairs_done}/{self.pairs_total}'
+              + (f' (еще {self.pairs_skipped} готовы по журналу)' if self.pairs_skipped else ''))
+        self.print_progress()
+        if self.manifest:
+            self.manifest.print_statistics('raw')
+
+        if self.url_registry:
+            self.url_registry.print_statistics()
+        if self.host_scheduler:
+            self.host_scheduler.print_statistics()
+        page_cache = get_page_cache()
+        if page_cache:
+            page_cache.print_statistics()
@@ -0,0 +1,306 @@
+import argparse
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, date
+from functools import partial
+
+from config.settings import settings
+from tools.raw_data import get_telegram_base, save_raw_data
+from tools.run_manifest import FAILED, PARTIAL
+from tools.scheduler import SweepScheduler
+from tools.storage import save_frame
+from tools.work_queue import WorkQueue
+
+
+def run_dir(period: str, month_begin) -> str:
+    """
+    Каталог одного обхода: очередь, базы Telegram и результаты исполнителей.
+
+    Для обхода на нескольких машинах settings.SHARDED_SWEEP['shared_dir'] указывает на общее хранилище
+    """
+    shared_dir = settings.SHARDED_SWEEP['shared_dir'] or os.path.join(settings.OUTPUT_DIR_CACHE, 'runs')
+    return os.path.join(shared_dir, f'RUN_{period}_{month_begin}')
+
+
+def queue_path(directory: str) -> str:
+    return os.path.join(directory, 'queue.sqlite')
+
+
+def telegram_dir(directory: str) -> str:
+    return os.path.join(directory, 'telegram')
+
+
+def partition_dir(directory: str, worker: str) -> str:
+    """Каталог результатов одного исполнителя (исполнители не пишут в общие файлы)"""
+    return os.path.join(directory, 'partitions', worker)
+
+
+def open_queue(path: str) -> WorkQueue:
+    options = settings.SHARDED_SWEEP
+    return WorkQueue(path, max_attempts=options['max_attempts'], lease_seconds=options['lease_seconds'],
+                     journal_mode=options['journal_mode'])
+
+
+def prepare_telegram_bases(directory: str, categories: list[str], period: str, to_excel: bool,
+                           month_begin_utc: datetime):
+    """
+    Собирает базы Telegram по категориям в запускающем процессе и сохраняет их в каталог обхода.
+
+    Сессия Telegram не может использоваться несколькими процессами одновременно, поэтому исполнители
+    базы не скачивают, а только читают готовые файлы
+    """
+    for category in categories:
+        telegram_data, _ = get_telegram_base(category, None, period, to_excel, month_begin_utc)
+        save_frame(telegram_data, telegram_dir(directory), f'Telegram_{category}_BASE_{period}_{month_begin_utc}')
+
+
+def start_workers(queue_file: str, node: str, processes: int) -> list[subprocess.Popen]:
+    """Запускает исполнителей на этой машине (имена уникальны между машинами: имя машины и номер)"""
+    return [
+        subprocess.Popen(
+            [sys.executable, '-m', 'tools.sharded_sweep', '--queue', queue_file, '--worker', f'{node}-{number}'],
+            cwd=settings.OUTPUT_ABS_DIR
+        )
+        for number in range(1, processes + 1)
+    ]
+
+
+def merge_partitions(directory: str, output_dir: str = None) -> int:
+    """
+    Переносит результаты исполнителей в общий каталог сырых данных.
+
+    Каждая пара берется только из каталога исполнителя, чей результат засчитан в очереди. Файлы
+    исполнителя, потерявшего аренду (пару за него выполнил другой), не переносятся
+    """
+    output_dir = output_dir or settings.OUTPUT_DIR_RAW
+    os.makedirs(output_dir, exist_ok=True)
+
+    queue = open_queue(queue_path(directory))
+    params = queue.params()
+    moved = 0
+    for region, category, worker in queue.done_units():
+        name = f'RAW_{category}_{region}_{params["period"]}_{params["month_begin"]}'
+        for path in glob.glob(os.path.join(glob.escape(partition_dir(directory, worker)), glob.escape(name) + '.*')):
+            shutil.move(path, os.path.join(output_dir, os.path.basename(path)))
+            moved += 1
+    queue.close()
+
+    print(f'Результаты исполнителей перенесены в {output_dir}: файлов {moved}')
+    return moved
+
+
+def run_sharded(
+        sources: list[str],
+        regions: list[str],
+        categories: list[str],
+        period: str,
+        to_excel: bool,
+        month_begin: date,
+        month_begin_utc: datetime,
+        workers: int = None,
+        batch_size: int = None
+):
+    """
+    Обход регион × категория несколькими процессами, в том числе на нескольких машинах.
+
+    Пары раскладываются в общую очередь (SQLite), каждый исполнитель — отдельный процесс со своим
+    циклом событий и пулом браузеров — берет пары пачками в аренду и выполняет их обычным SweepScheduler.
+    На других машинах исполнители подключаются к той же очереди на общем хранилище:
+    python -m tools.sharded_sweep --queue <каталог обхода>/queue.sqlite --worker <имя машины> --processes N
+
+    Исполнители пишут результаты в свои каталоги, по окончании очереди они переносятся в каталог сырых
+    данных. Повторный запуск продолжает обход: готовые пары не повторяются.
+    """
+    options = settings.SHARDED_SWEEP
+    workers = options['workers'] if workers is None else workers
+    batch_size = batch_size or options['batch_size']
+
+    directory = run_dir(period, month_begin)
+    queue = open_queue(queue_path(directory))
+    queue.setup(
+        pairs=[(region, category) for region in regions for category in categories],
+        params={
+            'sources': sources,
+            'period': period,
+            'to_excel': to_excel,
+            'month_begin': month_begin.isoformat(),
+            'month_begin_utc': month_begin_utc.isoformat(),
+            'batch_size': batch_size,
+            'workers': max(workers, 1) * options['nodes']  # Всего исполнителей на всех машинах
+        }
+    )
+
+    if 'Telegram' in sources:
+        print('**** СБОР БАЗ TELEGRAM ****')
+        prepare_telegram_bases(directory, categories, period, to_excel, month_begin_utc)
+
+    start_time = time.time()
+    processes = start_workers(queue.path, socket.gethostname(), workers)
+    print(f'Запущено исполнителей: {len(processes)}. Очередь: {queue.path}')
+
+    # Ждем, пока очередь не разберут все машины (если других машин нет — пока работают свои исполнители)
+    while not queue.finished() and (options['nodes'] > 1 or any(process.poll() is None for process in processes)):
+        time.sleep(options['progress_interval'])
+        queue.print_progress(start_time)
+    for process in processes:
+        process.wait()
+
+    failed_workers = sum(1 for process in processes if process.returncode != 0)
+    print(f'Обход завершен за {round((time.time() - start_time) / 60, 2)} мин.'
+          + (f' Исполнителей завершилось с ошибкой: {failed_workers}' if failed_workers else ''))
+    queue.print_progress(start_time)
+    queue.print_statistics()
+    queue.close()
+
+    merge_partitions(directory)
+
+
+class BatchProgress:
+    """Текущая пачка исполнителя: когда взята и ее планировщик (для проверки, что работа продвигается)"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.scheduler = None
+
+    def start(self):
+        self.started_at = time.time()
+        self.scheduler = None
+
+    def value(self) -> int:
+        scheduler = self.scheduler
+        return scheduler.progress() if scheduler else 0
+
+
+def _heartbeat(path: str, worker: str, batch: BatchProgress, stop: threading.Event):
+    """
+    Продлевает аренду пар исполнителя (отдельное соединение в своем потоке).
+
+    Аренда продлевается, только если с прошлого продления завершилась хоть одна задача или загрузка
+    страницы и пачка идет не дольше max_batch_seconds: пары зависшего исполнителя вернутся в очередь
+    """
+    queue = open_queue(path)
+    max_batch_seconds = settings.SHARDED_SWEEP['max_batch_seconds']
+    last_progress, last_started_at = None, None
+    while not stop.wait(queue.lease_seconds / 3):
+        progress, started_at = batch.value(), batch.started_at
+        if started_at != last_started_at:
+            # Новая пачка: аренда только что выдана при взятии
+            last_progress, last_started_at = progress, started_at
+            continue
+        if progress == last_progress:
+            print(f'{worker}: пачка не продвигается, аренда не продлена')
+            continue
+        if time.time() - started_at > max_batch_seconds:
+            print(f'{worker}: пачка идет дольше {max_batch_seconds} с, аренда не продлена')
+            continue
+        last_progress = progress
+        try:
+            queue.heartbeat(worker)
+        except Exception as e:
+            print(f'{worker}: не удалось продлить аренду: {e}')
+    queue.close()
+
+
+def run_worker(path: str, worker: str):
+    """Исполнитель: берет пары из очереди, пока она не опустеет"""
+    queue = open_queue(path)
+    params = queue.params()
+    workers = params['workers']
+    directory = os.path.dirname(path)
+
+    # Базы Telegram уже собраны запускающим процессом, исполнитель их только читает из каталога обхода
+    # и к Telegram не подключается (если базы нет, пары с Telegram завершаются ошибкой)
+    settings.TELEGRAM_INCREMENTAL = False
+    settings.TELEGRAM_PREPARED_ONLY = True
+    settings.OUTPUT_DIR_PROCESSED = telegram_dir(directory)
+    # Результаты исполнителя — в его собственный каталог, общий каталог собирается после обхода
+    settings.OUTPUT_DIR_RAW = partition_dir(directory, worker)
+    # Лимиты на хост общие для всех исполнителей: каждому достается своя доля
+    settings.HOST_SCHEDULER['max_total'] = max(1, settings.HOST_SCHEDULER['max_total'] // workers)
+    settings.HOST_SCHEDULER['max_per_host'] = max(1, settings.HOST_SCHEDULER['max_per_host'] // workers)
+    settings.HOST_SCHEDULER['initial_per_host'] = min(settings.HOST_SCHEDULER['initial_per_host'],
+                                                      settings.HOST_SCHEDULER['max_per_host'])
+
+    stop = threading.Event()
+    batch = BatchProgress()
+    heartbeat = threading.Thread(target=_heartbeat, args=(path, worker, batch, stop), daemon=True)
+    heartbeat.start()
+
+    period = params['period']
+    month_begin = date.fromisoformat(params['month_begin'])
+    category = None
+    try:
+        while units := queue.claim(worker, params['batch_size'], prefer_category=category):
+            category = units[0][1]
+            batch.start()
+            print(f'{worker}: взято пар {len(units)} ({category})')
+            try:
+                scheduler = SweepScheduler(
+                    sources=params['sources'],
+                    regions=sorted({region for region, _ in units}),
+                    categories=[category],
+                    period=period,
+                    to_excel=params['to_excel'],
+                    month_begin=month_begin,
+                    month_begin_utc=datetime.fromisoformat(params['month_begin_utc']),
+                    on_pair_done=partial(save_raw_data, period=period, month_begin=month_begin),
+                    pairs=units
+                )
+                batch.scheduler = scheduler
+                scheduler.run()
+            except Exception as e:
+                print(f'{worker}: ошибка пачки: {e}')
+                for region, unit_category in units:
+                    queue.fail(region, unit_category, worker, str(e))
+                continue
+
+            for region, unit_category in units:
+                status = scheduler.pair_status(region, unit_category)
+                if status == FAILED:
+                    queue.fail(region, unit_category, worker, 'ошибка пары, подробности в журнале обхода')
+                elif status == PARTIAL and queue.can_retry(region, unit_category):
+                    # Как при продолжении обхода в одном процессе: пару с упавшими источниками собираем заново.
+                    # На последней попытке частичный результат засчитывается, чтобы не потерять его совсем
+                    queue.fail(region, unit_category, worker, 'часть источников завершилась ошибкой')
+                elif not queue.done(region, unit_category, worker):
+                    print(f'{worker}: аренда пары {region} / {unit_category} истекла, результат не засчитан')
+                    _remove_outputs(scheduler, region, unit_category)
+    finally:
+        stop.set()
+        heartbeat.join()
+        queue.close()
+
+
+def _remove_outputs(scheduler: SweepScheduler, region: str, category: str):
+    """Удаляет файлы пары, результат которой не засчитан (пару выполнил другой исполнитель)"""
+    if not scheduler.manifest:
+        return
+    for output in scheduler.manifest.outputs(region, category, 'raw'):
+        if os.path.exists(output):
+            os.remove(output)
+
+
+# Исполнитель: python -m tools.sharded_sweep --queue PATH --worker NAME [--processes N]
+# Сборка результатов исполнителей вручную: python -m tools.sharded_sweep --queue PATH --merge
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Исполнитель обхода из общей очереди')
+    parser.add_argument('--queue', required=True, help='Файл очереди обхода')
+    parser.add_argument('--worker', default=socket.gethostname(), help='Имя исполнителя (машины при --processes)')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='Запустить столько исполнителей на этой машине (0 — работать в этом процессе)')
+    parser.add_argument('--merge', action='store_true', help='Перенести результаты исполнителей в каталог сырых данных')
+    args = parser.parse_args()
+
+    if args.merge:
+        merge_partitions(os.path.dirname(args.queue))
+    elif args.processes:
+        for process in start_workers(args.queue, args.worker, args.processes):
+            process.wait()
+    else:
+        run_worker(args.queue, args.worker)
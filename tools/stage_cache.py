@@ -0,0 +1,135 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Optional
+
+from config.settings import settings
+
+# Сколько ключей читать за один запрос
+FETCH_CHUNK_SIZE = 500
+
+
+def content_hash(*parts) -> str:
+    """Ключ результата этапа: sha256 от всех его входов (тексты, промпт, модель, настройки)"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class StageCache:
+    """
+    Дисковый кэш результатов этапов обработки (SQLite): тезисы текстов, кластеры тезисов.
+
+    Ключ — хэш входов этапа: текст документа, отрисованный промпт (его изменение — новая версия промпта),
+    провайдер и модель. Поэтому повторный запуск этапа обрабатывает только новые и измененные документы,
+    а новый промпт для одной категории пересчитывает только эту категорию.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        # Статистика по этапам
+        self.hits = Counter()
+        self.misses = Counter()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            )
+        ''')
+        self.connection.commit()
+
+    def get_many(self, stage: str, keys: Iterable[str]) -> dict[str, object]:
+        """Сохраненные результаты этапа по ключам (отсутствующих ключей в ответе нет)"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), FETCH_CHUNK_SIZE):
+                chunk = keys[start:start + FETCH_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f'SELECT key, value FROM results WHERE stage = ? AND key IN ({placeholders})', [stage, *chunk]
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+            self.hits[stage] += len(found)
+            self.misses[stage] += len(keys) - len(found)
+        return found
+
+    def get(self, stage: str, key: str):
+        """Результат этапа или None"""
+        return self.get_many(stage, [key]).get(key)
+
+    def set_many(self, stage: str, values: dict[str, object]):
+        """Сохраняет результаты этапа. None не сохраняется, чтобы неудачные запросы повторились"""
+        now = time.time()
+        rows = [(stage, key, json.dumps(value, ensure_ascii=False), now)
+                for key, value in values.items() if value is not None]
+        with self._lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO results (stage, key, value, created_at) VALUES (?, ?, ?, ?)', rows
+            )
+            self.connection.commit()
+
+    def set(self, stage: str, key: str, value):
+        self.set_many(stage, {key: value})
+
+    def invalidate(self, stage: str = None) -> int:
+        """Удаляет результаты этапа (без параметров — все). Возвращает число удаленных"""
+        with self._lock:
+            if stage:
+                cursor = self.connection.execute('DELETE FROM results WHERE stage = ?', (stage,))
+            else:
+                cursor = self.connection.execute('DELETE FROM results')
+            self.connection.commit()
+            return cursor.rowcount
+
+    def summary(self) -> list[tuple]:
+        """Количество сохраненных результатов по этапам"""
+        with self._lock:
+            return self.connection.execute('SELECT stage, COUNT(*) FROM results GROUP BY stage').fetchall()
+
+    def print_statistics(self):
+        for stage in sorted(set(self.hits) | set(self.misses)):
+            total = self.hits[stage] + self.misses[stage]
+            print(f'Кэш этапа {stage}: повторно использовано {self.hits[stage]}, '
+                  f'вычислено заново {self.misses[stage]} ({self.hits[stage] / total if total else 0:.1%} повторно)')
+
+
+_stage_cache = None
+
+
+def get_stage_cache() -> Optional[StageCache]:
+    """Общий кэш этапов процесса (None, если кэш выключен в настройках)"""
+    global _stage_cache
+    if not settings.STAGE_CACHE['enabled']:
+        return None
+    if _stage_cache is None:
+        _stage_cache = StageCache(os.path.join(settings.OUTPUT_DIR_CACHE, 'stages.sqlite'))
+    return _stage_cache
+
+
+# Инвалидация кэша: python -m tools.stage_cache --clear [--stage topics]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Управление кэшем этапов обработки')
+    parser.add_argument('--clear', action='store_true', help='Удалить результаты из кэша')
+    parser.add_argument('--stage', help='Только результаты этапа (topics, clusters)')
+    args = parser.parse_args()
+
+    cache = StageCache(os.path.join(settings.OUTPUT_DIR_CACHE, 'stages.sqlite'))
+    if args.clear:
+        deleted = cache.invalidate(args.stage)
+        print(f'Удалено результатов: {deleted}')
+    for stage, count in cache.summary():
+        print(f'{stage}: {count}')
@@ -0,0 +1,73 @@
+import os
+from typing import Optional
+
+import pandas as pd
+
+from config.settings import settings
+
+# Ограничение Excel на длину текста в ячейке
+EXCEL_CELL_LIMIT = 32767
+
+
+def frame_path(directory: str, name: str) -> str:
+    """Путь к файлу промежуточных данных в формате из настроек (Parquet или Feather)"""
+    return os.path.join(directory, f'{name}.{settings.INTERMEDIATE_FORMAT}')
+
+
+def save_frame(df: pd.DataFrame, directory: str, name: str) -> str:
+    """
+    Сохраняет промежуточные данные в колоночном формате.
+
+    В отличие от Excel запись и чтение быстрые, длина текста не ограничена, а типы
+    (в том числе даты с часовым поясом) сохраняются как есть.
+    """
+    filepath = frame_path(directory, name)
+    os.makedirs(directory, exist_ok=True)
+
+    match settings.INTERMEDIATE_FORMAT:
+        case 'parquet':
+            df.to_parquet(filepath, index=False)
+        case 'feather':
+            df.reset_index(drop=True).to_feather(filepath)
+        case _:
+            raise ValueError(f'Неизвестный формат промежуточных данных: {settings.INTERMEDIATE_FORMAT}')
+
+    return filepath
+
+
+def load_frame(directory: str, name: str) -> Optional[pd.DataFrame]:
+    """Загружает промежуточные данные (None, если файла нет)"""
+    filepath = frame_path(directory, name)
+    if not os.path.exists(filepath):
+        return None
+
+    match settings.INTERMEDIATE_FORMAT:
+        case 'parquet':
+            return pd.read_parquet(filepath)
+        case 'feather':
+            return pd.read_feather(filepath)
+        case _:
+            raise ValueError(f'Неизвестный формат промежуточных данных: {settings.INTERMEDIATE_FORMAT}')
+
+
+def export_excel(df: pd.DataFrame, filepath: str):
+    """Финальная выгрузка в Excel: даты без часового пояса, текст обрезан до ограничения ячейки"""
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            df[column] = df[column].dt.tz_localize(None)
+        elif df[column].dtype == object:
+            df[column] = df[column].map(_excel_value)
+
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False)
+
+
+def _excel_value(value):
+    if isinstance(value, str):
+        return value[:EXCEL_CELL_LIMIT]
+    if isinstance(value, pd.Timestamp) and value.tzinfo is not None:
+        return value.tz_localize(None)
+    if hasattr(value, 'tzinfo') and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
@@ -0,0 +1,163 @@
+import ast
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from config.settings import settings
+from llm.prompts import CLUSTER_NAMING_SYSTEM_MESSAGE, CLUSTER_NAMING_USER_MESSAGE
+from tools.stage_cache import content_hash, get_stage_cache
+
+
+def extract_topics(data_topics: pd.DataFrame) -> list[dict]:
+    """
+    Тезисы из результата генерации тем с весами: 2 — одобренный источник, 1 — остальные.
+
+    При settings.NEAR_DUPLICATES['weight_by_group_size'] вес умножается на число почти одинаковых
+    текстов, которые представляет строка (колонка duplicates).
+    """
+    weight_by_group_size = settings.NEAR_DUPLICATES['weight_by_group_size'] and 'duplicates' in data_topics.columns
+    topics = []
+    for _, row in data_topics.iterrows():
+        multiplier = int(row['duplicates']) if weight_by_group_size and pd.notna(row['duplicates']) else 1
+        if row['topics'] != '{}' and row['topics'] != '[]' and pd.notna(row['topics']):
+            new_topics = ast.literal_eval(row['topics']) if isinstance(row['topics'], str) else row['topics']
+            if isinstance(new_topics, list) and len(new_topics) != 0:
+                new_topics = new_topics[0]
+            if isinstance(new_topics, dict):
+                if len(new_topics) != 0 and 'topics' in new_topics.keys():
+                    for topic in [i for i in [i.strip(' "\'') for i in new_topics['topics']] if
+                                  i != 'нет информации' and len(i) != 0]:
+                        topics.append(
+                            {
+                                'topic': topic,
+                                'weight': (2 if row['approved'] else 1) * multiplier
+                            }
+                        )
+    return topics
+
+
+def _vectorize(texts: list[str], dimensions: int) -> np.ndarray:
+    """
+    Нормированные векторы тезисов: TF-IDF по символьным n-граммам (устойчивы к падежным окончаниям),
+    сжатый TruncatedSVD до dimensions, чтобы кластеризация работала с плотной матрицей небольшого размера
+    """
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True)
+    vectors = vectorizer.fit_transform([text.lower() for text in texts])
+    components = min(dimensions, vectors.shape[0] - 1, vectors.shape[1] - 1)
+    if components < 2:
+        return normalize(vectors.toarray())
+    return normalize(TruncatedSVD(n_components=components, random_state=0).fit_transform(vectors))
+
+
+def _agglomerate(vectors: np.ndarray, distance_threshold: float) -> np.ndarray:
+    if vectors.shape[0] == 1:
+        return np.zeros(1, dtype=int)
+    model = AgglomerativeClustering(n_clusters=None, distance_threshold=distance_threshold,
+                                    metric='cosine', linkage='average')
+    return model.fit_predict(vectors)
+
+
+def _cluster_labels(vectors: np.ndarray, distance_threshold: float, max_block_size: int) -> np.ndarray:
+    """
+    Метки кластеров.
+
+    Агломеративная кластеризация квадратична по памяти, поэтому большой набор сначала делится
+    MiniBatchKMeans на блоки не больше max_block_size, и кластеры ищутся внутри блоков.
+    """
+    count = vectors.shape[0]
+    if count <= max_block_size:
+        return _agglomerate(vectors, distance_threshold)
+
+    blocks = MiniBatchKMeans(n_clusters=math.ceil(count / max_block_size), random_state=0,
+                             n_init=3).fit_predict(vectors)
+    labels = np.empty(count, dtype=int)
+    offset = 0
+    for block in np.unique(blocks):
+        indexes = np.where(blocks == block)[0]
+        block_labels = _agglomerate(vectors[indexes], distance_threshold)
+        labels[indexes] = block_labels + offset
+        offset += block_labels.max() + 1
+    return labels
+
+
+def cluster_topics(topics: list[dict], distance_threshold: float = None, max_block_size: int = None) -> list[dict]:
+    """
+    Локальная кластеризация тезисов по TF-IDF (без запросов к LLM).
+
+    :param topics: Тезисы [{'topic': ..., 'weight': ...}]
+    :return: Кластеры в формате clusterization_topics (без названий), отсортированные по весу.
+             Тезисы кластера упорядочены по близости к центру кластера
+    """
+    distance_threshold = distance_threshold or settings.TOPIC_CLUSTERING['distance_threshold']
+    max_block_size = max_block_size or settings.TOPIC_CLUSTERING['max_block_size']
+    if not topics:
+        return []
+
+    vectors = _vectorize([topic['topic'] for topic in topics], settings.TOPIC_CLUSTERING['dimensions'])
+    labels = _cluster_labels(vectors, distance_threshold, max_block_size)
+
+    clusters = []
+    for label in np.unique(labels):
+        indexes = np.where(labels == label)[0]
+        closeness = vectors[indexes] @ vectors[indexes].mean(axis=0)
+        members = [topics[index] for index in indexes[np.argsort(-closeness)]]
+        clusters.append({
+            'cluster_name': members[0]['topic'],
+            'summarize': [{'theme': members[0]['topic']}],
+            'topics': members,
+            'weight_cluster': sum(topic['weight'] for topic in members)
+        })
+
+    clusters.sort(key=lambda cluster: cluster['weight_cluster'], reverse=True)
+    return clusters
+
+
+def clusterization_topics_local(llm, topics: list[dict]) -> list[dict]:
+    """
+    Кластеризация тезисов: группировка локально, LLM только называет и суммаризирует кластеры.
+
+    Называются крупнейшие по весу кластеры (settings.TOPIC_CLUSTERING['max_named_clusters'],
+    не меньше min_named_size тезисов), в запрос идут только ближайшие к центру тезисы, поэтому
+    размер запроса не зависит от количества тезисов. Остальные кластеры называются центральным тезисом.
+
+    Результат сохраняется в кэше этапов по хэшу тезисов, настроек, промпта и модели: если тезисы
+    не изменились, кластеры берутся из кэша без пересчета.
+    """
+    options = settings.TOPIC_CLUSTERING
+    cache = get_stage_cache()
+    key = content_hash(llm.provider, llm.model_version, CLUSTER_NAMING_SYSTEM_MESSAGE, CLUSTER_NAMING_USER_MESSAGE,
+                       options, sorted((topic['topic'], topic['weight']) for topic in topics))
+    if cache:
+        cached = cache.get('clusters', key)
+        if cached is not None:
+            print(f'Кластеризация: тезисы не изменились, кластеров {len(cached)} из кэша')
+            return cached
+
+    start_time = time.time()
+    clusters = cluster_topics(topics)
+    print(f'Кластеризация: тезисов {len(topics)}, кластеров {len(clusters)} ({time.time() - start_time:.1f} с)')
+
+    named = [cluster for cluster in clusters if len(cluster['topics']) >= options['min_named_size']]
+    named = named[:options['max_named_clusters']]
+    names = llm.name_clusters([[topic['topic'] for topic in cluster['topics'][:options['topics_per_naming']]]
+                               for cluster in named])
+    naming_failed = 0
+    for cluster, name in zip(named, names):
+        if isinstance(name, dict) and name.get('cluster_name'):
+            cluster['cluster_name'] = name['cluster_name']
+            cluster['summarize'] = name.get('summarize') or cluster['summarize']
+        else:
+            naming_failed += 1
+
+    # С запасными названиями (центральный тезис) результат не кэшируем, чтобы названия запросились снова
+    if cache and not naming_failed:
+        cache.set('clusters', key, clusters)
+    elif naming_failed:
+        print(f'Кластеризация: не удалось назвать кластеров {naming_failed}, результат не сохранен в кэш')
+    return clusters
@@ -0,0 +1,73 @@
+import asyncio
+from collections import defaultdict
+from typing import Callable, Awaitable, Optional
+
+from tools.normalize_data import canonicalize_url
+
+
+class UrlRegistry:
+    """
+    Реестр URL на весь обход.
+
+    Каждый найденный URL после канонизации скачивается один раз, а результат раздается всем парам
+    регион/категория, которые на него сослались. Одновременные запросы одного URL ждут один и тот же Future.
+    """
+
+    def __init__(self, release_content: bool = False):
+        # Если текст страниц уже сохраняется в кэше страниц, в памяти его держать не нужно:
+        # повторный запрос будет обслужен кэшем. Неудачные загрузки не запоминаются: одновременные
+        # запросы получают общий пустой результат, а следующее обращение к URL скачивает его заново.
+        self.release_content = release_content
+        self._futures: dict[str, asyncio.Future] = {}
+        self._seen: set[str] = set()
+        self.references: dict[str, set] = defaultdict(set)  # Канонический URL -> пары (регион, категория)
+
+        # Статистика
+        self.requests = 0
+        self.fetched = 0
+
+    async def resolve(self, url: str, fetch: Callable[[str], Awaitable[Optional[str]]],
+                      pair: tuple = None) -> Optional[str]:
+        """Возвращает текст страницы, скачивая ее только при первом обращении к каноническому URL"""
+        canonical = canonicalize_url(url)
+        self.requests += 1
+        if pair:
+            self.references[canonical].add(pair)
+
+        future = self._futures.get(canonical)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[canonical] = future
+        if canonical not in self._seen:
+            # Повторная загрузка отпущенного URL обслуживается кэшем страниц и скачиванием не считается
+            self._seen.add(canonical)
+            self.fetched += 1
+        content = None
+        try:
+            content = await fetch(url)
+        except Exception:
+            pass
+        finally:
+            # Ожидающие не должны зависнуть, даже если загрузку отменили
+            future.set_result(content)
+            if not content:
+                # Следующее обращение — новая попытка загрузки (в том числе после отмены)
+                del self._futures[canonical]
+                self._seen.discard(canonical)
+            elif self.release_content:
+                del self._futures[canonical]
+
+        return content
+
+    @property
+    def duplicates(self) -> int:
+        """Количество обращений, обслуженных без повторного скачивания"""
+        return self.requests - self.fetched
+
+    def print_statistics(self):
+        share = self.duplicates / self.requests if self.requests else 0
+        shared_urls = sum(1 for pairs in self.references.values() if len(pairs) > 1)
+        print(f'Реестр URL: обращений {self.requests}, уникальных URL {self.fetched}, '
+              f'дубликатов {self.duplicates} ({share:.1%}), URL в нескольких парах: {shared_urls}')
@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+
+# Статусы единицы в очереди
+PENDING = 'pending'  # Ждет исполнителя
+CLAIMED = 'claimed'  # Взята исполнителем
+DONE = 'done'  # Выполнена
+FAILED = 'failed'  # Исчерпала попытки
+
+
+class WorkQueue:
+    """
+    Очередь пар (регион, категория) для исполнителей обхода (SQLite), в том числе на нескольких машинах.
+
+    Исполнители разбирают пары пачками: пачка берется в одной транзакции BEGIN IMMEDIATE, поэтому
+    одну пару не получат два исполнителя. Пачка по возможности из одной категории (той же, что у
+    прошлой пачки исполнителя), чтобы база Telegram категории загружалась в процессе один раз.
+
+    Взятая пара арендуется на lease_seconds, исполнитель продлевает аренду (heartbeat), пока его работа
+    продвигается. Если исполнитель завис или пропал вместе с машиной, аренда истекает и пара возвращается
+    в очередь. Результат засчитывается, только если пара все еще арендована этим исполнителем. В очереди же
+    хранятся параметры обхода, общие для всех исполнителей.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 2, lease_seconds: float = 900, journal_mode: str = 'WAL'):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        # WAL не работает в сетевых папках: для очереди на общем хранилище нужен режим DELETE
+        self.connection.execute(f'PRAGMA journal_mode={journal_mode}')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS units (
+                region TEXT NOT NULL,
+                category TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                started_at REAL,
+                finished_at REAL,
+                lease_until REAL,
+                PRIMARY KEY (region, category)
+            )
+        ''')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS params (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        # Очереди, созданные до появления аренды
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(units)')}
+        if 'lease_until' not in columns:
+            self.connection.execute('ALTER TABLE units ADD COLUMN lease_until REAL')
+
+    def setup(self, pairs: list[tuple[str, str]], params: dict):
+        """
+        Заполняет очередь и сохраняет параметры обхода.
+
+        Уже выполненные пары остаются выполненными, исчерпавшие попытки возвращаются в ожидание.
+        Взятые пары не трогаются: их исполнители могут еще работать, а пропавшие вернутся по истечении аренды
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO units (region, category, status) VALUES (?, ?, ?)',
+            [(region, category, PENDING) for region, category in pairs]
+        )
+        self.connection.execute(
+            'UPDATE units SET status = ?, worker = NULL, attempts = 0 WHERE status = ?', (PENDING, FAILED)
+        )
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO params (key, value) VALUES (?, ?)',
+            [(key, json.dumps(value, ensure_ascii=False)) for key, value in params.items()]
+        )
+        self.connection.execute('COMMIT')
+
+    def params(self) -> dict:
+        return {key: json.loads(value) for key, value in self.connection.execute('SELECT key, value FROM params')}
+
+    def claim(self, worker: str, batch_size: int, prefer_category: Optional[str] = None) -> list[tuple[str, str]]:
+        """Берет до batch_size ожидающих пар одной категории (пустой список — очередь разобрана)"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_leases()
+            category = None
+            if prefer_category is not None:
+                row = self.connection.execute(
+                    'SELECT 1 FROM units WHERE status = ? AND category = ? LIMIT 1', (PENDING, prefer_category)
+                ).fetchone()
+                category = prefer_category if row else None
+            if category is None:
+                row = self.connection.execute(
+                    'SELECT category FROM units WHERE status = ? GROUP BY category ORDER BY COUNT(*) DESC LIMIT 1',
+                    (PENDING,)
+                ).fetchone()
+                if row is None:
+                    self.connection.execute('COMMIT')
+                    return []
+                category = row[0]
+
+            units = self.connection.execute(
+                'SELECT region, category FROM units WHERE status = ? AND category = ? ORDER BY rowid LIMIT ?',
+                (PENDING, category, batch_size)
+            ).fetchall()
+            now = time.time()
+            self.connection.executemany(
+                'UPDATE units SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, lease_until = ? '
+                'WHERE region = ? AND category = ?',
+                [(CLAIMED, worker, now, now + self.lease_seconds, region, unit_category)
+                 for region, unit_category in units]
+            )
+            self.connection.execute('COMMIT')
+            return units
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def _expire_leases(self):
+        """Пары с истекшей арендой возвращаются в очередь (или считаются упавшими, если попытки исчерпаны)"""
+        cursor = self.connection.execute(
+            'UPDATE units SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, worker = NULL, '
+            "error = 'истекла аренда исполнителя ' || worker WHERE status = ? AND lease_until < ?",
+            (self.max_attempts, PENDING, FAILED, CLAIMED, time.time())
+        )
+        if cursor.rowcount:
+            print(f'Истекла аренда пар: {cursor.rowcount}, возвращены в очередь')
+
+    def heartbeat(self, worker: str) -> int:
+        """Продлевает аренду пар исполнителя. Возвращает число пар, которые все еще за ним"""
+        cursor = self.connection.execute(
+            'UPDATE units SET lease_until = ? WHERE status = ? AND worker = ?',
+            (time.time() + self.lease_seconds, CLAIMED, worker)
+        )
+        return cursor.rowcount
+
+    def can_retry(self, region: str, category: str) -> bool:
+        """Остались ли у пары попытки"""
+        row = self.connection.execute(
+            'SELECT attempts FROM units WHERE region = ? AND category = ?', (region, category)
+        ).fetchone()
+        return row is not None and row[0] < self.max_attempts
+
+    def done(self, region: str, category: str, worker: str) -> bool:
+        """Засчитывает пару (False, если аренда истекла и пара уже отдана другому исполнителю)"""
+        cursor = self.connection.execute(
+            'UPDATE units SET status = ?, error = NULL, finished_at = ? '
+            'WHERE region = ? AND category = ? AND status = ? AND worker = ?',
+            (DONE, time.time(), region, category, CLAIMED, worker)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, region: str, category: str, worker: str, error: str):
+        """Ошибка пары: пара возвращается в очередь, пока не исчерпаны попытки"""
+        self.connection.execute(
+            'UPDATE units SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, worker = NULL, error = ?, '
+            'finished_at = ? WHERE region = ? AND category = ? AND status = ? AND worker = ?',
+            (self.max_attempts, PENDING, FAILED, error, time.time(), region, category, CLAIMED, worker)
+        )
+
+    def done_units(self) -> list[tuple[str, str, str]]:
+        """Выполненные пары и исполнители, чей результат засчитан: (регион, категория, исполнитель)"""
+        return self.connection.execute(
+            'SELECT region, category, worker FROM units WHERE status = ?', (DONE,)
+        ).fetchall()
+
+    def finished(self) -> bool:
+        """Все пары выполнены или исчерпали попытки"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        self._expire_leases()
+        self.connection.execute('COMMIT')
+        counts = self.counts()
+        return not counts.get(PENDING) and not counts.get(CLAIMED)
+
+    def counts(self) -> dict[str, int]:
+        return dict(self.connection.execute('SELECT status, COUNT(*) FROM units GROUP BY status').fetchall())
+
+    def workers(self) -> dict[str, tuple[int, float]]:
+        """Выполненные пары и суммарное время по исполнителям"""
+        rows = self.connection.execute(
+            'SELECT worker, COUNT(*), COALESCE(SUM(finished_at - started_at), 0) FROM units '
+            'WHERE status = ? GROUP BY worker', (DONE,)
+        ).fetchall()
+        return {worker: (count, busy_time) for worker, count, busy_time in rows}
+
+    def close(self):
+        self.connection.close()
+
+    def print_progress(self, start_time: float):
+        counts = self.counts()
+        total = sum(counts.values())
+        elapsed = max(time.time() - start_time, 1e-9)
+        print(f'Очередь обхода: готово {counts.get(DONE, 0)}/{total}, в работе {counts.get(CLAIMED, 0)}, '
+              f'ожидает {counts.get(PENDING, 0)}, ошибок {counts.get(FAILED, 0)}, '
+              f'{counts.get(DONE, 0) / elapsed * 60:.2f} пар/мин')
+
+    def print_statistics(self):
+        for worker, (count, busy_time) in sorted(self.workers().items()):
+            print(f'    {worker}: пар {count}, среднее время пары {busy_time / count:.1f} сек.')
+        failed = self.connection.execute(
+            'SELECT region, category, error FROM units WHERE status = ? LIMIT 10', (FAILED,)
+        ).fetchall()
+        for region, category, error in failed:
+            print(f'    {region} / {category}: {error}')